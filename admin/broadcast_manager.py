@@ -3,81 +3,159 @@ Broadcast Manager for ICT Trading Oracle
 """
 
 import asyncio
+import hashlib
 import logging
 from datetime import datetime
+from typing import NamedTuple, Optional
 from telegram import Bot
-from telegram.error import TelegramError
+from telegram.error import TelegramError, RetryAfter
+from telegram.request import HTTPXRequest
+from config.settings import BOT_CONNECTION_POOL_SIZE
 
 logger = logging.getLogger(__name__)
 
+# Telegram allows ~30 messages/second globally; stay just under it
+BROADCAST_CONCURRENCY = 25
+
+
+class BroadcastJob(NamedTuple):
+    """A queued broadcast waiting for the worker"""
+    job_id: int
+    message_text: str
+    target_group: str
+    image_url: Optional[str]
+
+
 class BroadcastManager:
-    def __init__(self, bot_token, db_manager):
-        self.bot = Bot(token=bot_token)
+    def __init__(self, bot_token, db_manager, bot=None):
+        # Prefer the application's shared Bot so broadcasts reuse its connection pool
+        if bot is None:
+            request = HTTPXRequest(
+                connection_pool_size=BOT_CONNECTION_POOL_SIZE,
+                pool_timeout=10,
+                connect_timeout=5,
+                read_timeout=20
+            )
+            bot = Bot(token=bot_token, request=request)
+        self.bot = bot
         self.db = db_manager
+        self._queue = asyncio.Queue()
+        self._worker_task = None
+        # Photo key -> Telegram file_id of an already uploaded photo (see _photo_key)
+        self._photo_file_ids = {}
+        # Photo key -> future resolving to the file_id of a first upload still in flight
+        self._photo_uploads = {}
+    
+    def start_worker(self):
+        """Start the background task that sends queued broadcasts one at a time"""
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._worker_loop())
+        return self._worker_task
+    
+    async def enqueue_broadcast(self, message_text, target_group="all", image_url=None):
+        """Queue a broadcast and return its job id without waiting for delivery"""
+        loop = asyncio.get_event_loop()
+        job_id = await loop.run_in_executor(
+            None, self.db.create_broadcast_job, message_text, target_group, image_url
+        )
+        if job_id is None:
+            return None
+        
+        await self._queue.put(BroadcastJob(job_id, message_text, target_group, image_url))
+        self.start_worker()
+        return job_id
+    
+    def get_job_status(self, job_id):
+        """Get the stored status of a queued broadcast"""
+        return self.db.get_broadcast_job(job_id)
+    
+    async def _worker_loop(self):
+        """Consume queued broadcast jobs serially"""
+        loop = asyncio.get_event_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                await loop.run_in_executor(None, self.db.update_broadcast_job, job.job_id, 'RUNNING')
+                result = await self.broadcast_message(job.message_text, job.target_group, job.image_url)
+                status = 'DONE' if result.get('success') else 'FAILED'
+                await loop.run_in_executor(None, self.db.update_broadcast_job, job.job_id, status, result)
+            except Exception as e:
+                logger.error(f"Error running broadcast job {job.job_id}: {e}")
+                await loop.run_in_executor(None, self.db.update_broadcast_job, job.job_id, 'FAILED')
+            finally:
+                self._queue.task_done()
     
     async def broadcast_message(self, message_text, target_group="all", image_url=None):
         """Broadcast message to specified user group"""
         try:
-            # Get target users
+            # Resolve target group
             if target_group == "all":
-                users = self.db.get_all_users()
-            elif target_group == "premium":
-                users = self.db.get_users_by_subscription("premium")
-            elif target_group == "vip":
-                users = self.db.get_users_by_subscription("vip")
-            elif target_group == "free":
-                users = self.db.get_users_by_subscription("free")
+                subscription = None
+            elif target_group in ("premium", "vip", "free"):
+                subscription = target_group
             else:
-                users = []
-            
-            if not users:
                 return {
                     'success': False,
                     'message': 'No users found for the specified group'
                 }
             
-            # Send messages
+            # A URL may serve different content later, so URL file_ids only live for one broadcast
+            self._photo_file_ids = {
+                key: file_id for key, file_id in self._photo_file_ids.items() if key[0] == 'content'
+            }
+            
+            semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+            total_users = 0
             successful_sends = 0
             failed_sends = 0
+            blocked_ids = []
             
-            for user in users:
-                try:
-                    if image_url:
-                        await self.bot.send_photo(
-                            chat_id=user['user_id'],
-                            photo=image_url,
-                            caption=message_text,
-                            parse_mode='Markdown'
-                        )
-                    else:
-                        await self.bot.send_message(
-                            chat_id=user['user_id'],
-                            text=message_text,
-                            parse_mode='Markdown'
-                        )
-                    
-                    successful_sends += 1
+            # Stream users in batches so memory stays flat for large user bases;
+            # each keyset page is a blocking SQLite query, so fetch it off the event loop
+            loop = asyncio.get_event_loop()
+            pages = self.db.iter_users(subscription=subscription)
+            while True:
+                users = await loop.run_in_executor(None, next, pages, None)
+                if users is None:
+                    break
+                total_users += len(users)
+                
+                # Send messages concurrently, bounded by the semaphore
+                results = await asyncio.gather(
+                    *[self._send_one(semaphore, user, message_text, image_url) for user in users],
+                    return_exceptions=True
+                )
+                
+                for user, result in zip(users, results):
+                    if not isinstance(result, Exception):
+                        successful_sends += 1
+                        continue
                     
-                    # Add small delay to avoid rate limiting
-                    await asyncio.sleep(0.1)
-                    
-                except TelegramError as e:
                     failed_sends += 1
-                    logger.warning(f"Failed to send message to user {user['user_id']}: {e}")
+                    logger.warning(f"Failed to send message to user {user['user_id']}: {result}")
                     
-                    # If user blocked the bot, mark as inactive
-                    if "blocked" in str(e).lower():
-                        self.db.mark_user_inactive(user['user_id'])
+                    # If user blocked the bot, mark as inactive once sending is done
+                    if isinstance(result, TelegramError) and "blocked" in str(result).lower():
+                        blocked_ids.append(user['user_id'])
+            
+            if blocked_ids:
+                await loop.run_in_executor(None, self.db.mark_users_inactive_bulk, blocked_ids)
+            
+            if not total_users:
+                return {
+                    'success': False,
+                    'message': 'No users found for the specified group'
+                }
             
             # Log broadcast
             self._log_broadcast(message_text, target_group, successful_sends, failed_sends)
             
             return {
                 'success': True,
-                'total_users': len(users),
+                'total_users': total_users,
                 'successful_sends': successful_sends,
                 'failed_sends': failed_sends,
-                'success_rate': (successful_sends / len(users)) * 100 if users else 0
+                'success_rate': (successful_sends / total_users) * 100
             }
             
         except Exception as e:
@@ -87,6 +165,68 @@ class BroadcastManager:
                 'message': str(e)
             }
     
+    async def _send_one(self, semaphore, user, message_text, image_url=None):
+        """Send broadcast to a single user, honouring Telegram flood control"""
+        async with semaphore:
+            try:
+                await self._deliver(user['user_id'], message_text, image_url)
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                await self._deliver(user['user_id'], message_text, image_url)
+    
+    async def _deliver(self, chat_id, message_text, image_url=None):
+        """Send a text or photo message"""
+        if image_url:
+            await self._send_photo(chat_id, image_url, message_text)
+        else:
+            await self.bot.send_message(
+                chat_id=chat_id,
+                text=message_text,
+                parse_mode='Markdown'
+            )
+    
+    @staticmethod
+    def _photo_key(photo):
+        """Cache key for a photo: a content hash for raw bytes, the URL itself otherwise"""
+        if isinstance(photo, (bytes, bytearray)):
+            return ('content', hashlib.blake2b(photo, digest_size=16).hexdigest())
+        return ('url', str(photo))
+    
+    async def _send_photo(self, chat_id, photo, caption):
+        """Send a photo, uploading each distinct image only once and reusing its file_id"""
+        key = self._photo_key(photo)
+        
+        file_id = self._photo_file_ids.get(key)
+        if file_id is None:
+            pending = self._photo_uploads.get(key)
+            if pending is None:
+                # First sender of this image uploads it; other senders of the same image await its file_id
+                pending = asyncio.get_event_loop().create_future()
+                self._photo_uploads[key] = pending
+                try:
+                    message = await self.bot.send_photo(
+                        chat_id=chat_id,
+                        photo=photo,
+                        caption=caption,
+                        parse_mode='Markdown'
+                    )
+                    if message.photo:
+                        self._photo_file_ids[key] = message.photo[-1].file_id
+                finally:
+                    del self._photo_uploads[key]
+                    pending.set_result(self._photo_file_ids.get(key))
+                return
+            
+            # If the first upload failed, send the original photo instead
+            file_id = await pending or photo
+        
+        await self.bot.send_photo(
+            chat_id=chat_id,
+            photo=file_id,
+            caption=caption,
+            parse_mode='Markdown'
+        )
+    
     def _log_broadcast(self, message, target_group, successful, failed):
         """Log broadcast activity"""
         try:
@@ -2,11 +2,19 @@
 Report Generator for ICT Trading Oracle
 """
 
+import matplotlib
+matplotlib.use('Agg')  # Headless backend; charts are rendered off the main thread
+matplotlib.rcParams['text.hinting'] = 'none'
 import matplotlib.pyplot as plt
-import pandas as pd
-from datetime import datetime, timedelta
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+import numpy as np
+from PIL import Image as PILImage
+from datetime import datetime
 import io
 import base64
+import tempfile
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
 from reportlab.lib.styles import getSampleStyleSheet
@@ -14,117 +22,154 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+CHART_DPI = 100
+# Fixed margins for the date-axis charts (rotated tick labels need the taller bottom)
+CHART_MARGINS = dict(left=0.08, right=0.97, top=0.92, bottom=0.18)
+REPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024  # Spill PDF output to disk beyond 8MB
+
 class ReportGenerator:
     def __init__(self, db_manager):
         self.db = db_manager
         plt.style.use('seaborn-v0_8')
+        
+        # Persistent (figure, axes, artist) per chart, built on first render and reused
+        self._growth_chart = None
+        self._revenue_chart = None
+        self._accuracy_chart = None
+        self._subscription_chart = None
     
-    def generate_user_growth_chart(self, days=30):
-        """Generate user growth chart"""
+    def _new_figure(self, figsize):
+        """Create a standalone Agg figure (kept out of pyplot's global figure registry)"""
+        fig = Figure(figsize=figsize, dpi=CHART_DPI)
+        FigureCanvasAgg(fig)
+        return fig, fig.add_subplot()
+    
+    def _day_range(self, days):
+        """Daily datetime64 axis covering the last N days (matplotlib plots it natively)"""
+        today = np.datetime64(datetime.now(), 'D')
+        return np.arange(today - days, today + 1)
+    
+    def _figure_png(self, fig):
+        """Render figure to raw PNG bytes"""
+        # Draw once on the Agg canvas and let Pillow encode the RGBA buffer
+        fig.canvas.draw()
+        image = PILImage.frombuffer('RGBA', fig.canvas.get_width_height(), fig.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+        
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG', optimize=False, compress_level=1)
+        return buffer.getvalue()
+    
+    def _to_base64(self, png_bytes):
+        """Base64 encode PNG bytes for external (JSON/HTTP) callers"""
+        return base64.b64encode(png_bytes).decode() if png_bytes else None
+    
+    def _render_user_growth_png(self, days=30):
+        """Generate user growth chart as raw PNG bytes"""
         try:
             # Get user registration data for last N days
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
+            dates = self._day_range(days)
             
             # Mock data (replace with real database query)
-            dates = pd.date_range(start=start_date, end=end_date, freq='D')
             daily_users = [5, 8, 12, 7, 15, 20, 18, 25, 30, 22, 28, 35, 40, 32, 45, 50, 38, 55, 60, 48, 65, 70, 58, 75, 80, 68, 85, 90, 78, 95]
             
-            plt.figure(figsize=(12, 6))
-            plt.plot(dates[:len(daily_users)], daily_users, marker='o', linewidth=2, markersize=4)
-            plt.title('User Growth (Last 30 Days)', fontsize=16, fontweight='bold')
-            plt.xlabel('Date', fontsize=12)
-            plt.ylabel('New Users', fontsize=12)
-            plt.grid(True, alpha=0.3)
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            
-            # Save to base64
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            chart_base64 = base64.b64encode(buffer.getvalue()).decode()
-            plt.close()
+            if self._growth_chart is None:
+                fig, ax = self._new_figure((12, 6))
+                line, = ax.plot(dates[:len(daily_users)], daily_users, marker='o', linewidth=2, markersize=4)
+                ax.set_title('User Growth (Last 30 Days)', fontsize=16, fontweight='bold')
+                ax.set_xlabel('Date', fontsize=12)
+                ax.set_ylabel('New Users', fontsize=12)
+                ax.grid(True, alpha=0.3)
+                ax.tick_params(axis='x', labelrotation=45)
+                fig.subplots_adjust(**CHART_MARGINS)
+                self._growth_chart = (fig, ax, line)
+            else:
+                fig, ax, line = self._growth_chart
+                line.set_data(dates[:len(daily_users)], daily_users)
+                ax.relim()
+                ax.autoscale_view()
             
-            return chart_base64
+            return self._figure_png(fig)
             
         except Exception as e:
             logger.error(f"Error generating user growth chart: {e}")
             return None
     
-    def generate_revenue_chart(self, days=30):
-        """Generate revenue chart"""
+    def _render_revenue_png(self, days=30):
+        """Generate revenue chart as raw PNG bytes"""
         try:
             # Mock revenue data
-            dates = pd.date_range(start=datetime.now() - timedelta(days=days), end=datetime.now(), freq='D')
+            dates = self._day_range(days)
             daily_revenue = [45000, 52000, 48000, 67000, 71000, 58000, 89000, 95000, 82000, 105000, 
                            112000, 98000, 125000, 135000, 118000, 145000, 158000, 142000, 165000, 175000,
                            162000, 185000, 195000, 178000, 205000, 218000, 195000, 225000, 238000, 215000]
             
-            plt.figure(figsize=(12, 6))
-            plt.bar(dates[:len(daily_revenue)], daily_revenue, alpha=0.7, color='green')
-            plt.title('Daily Revenue (Last 30 Days)', fontsize=16, fontweight='bold')
-            plt.xlabel('Date', fontsize=12)
-            plt.ylabel('Revenue (Toman)', fontsize=12)
-            plt.grid(True, alpha=0.3)
-            plt.xticks(rotation=45)
-            
-            # Format y-axis to show values in thousands
-            plt.gca().yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x/1000:.0f}K'))
-            
-            plt.tight_layout()
+            if self._revenue_chart is None:
+                fig, ax = self._new_figure((12, 6))
+                ax.set_title('Daily Revenue (Last 30 Days)', fontsize=16, fontweight='bold')
+                ax.set_xlabel('Date', fontsize=12)
+                ax.set_ylabel('Revenue (Toman)', fontsize=12)
+                ax.grid(True, alpha=0.3)
+                ax.tick_params(axis='x', labelrotation=45)
+                
+                # Format y-axis to show values in thousands
+                ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'{x/1000:.0f}K'))
+                bars = None
+            else:
+                fig, ax, bars = self._revenue_chart
+                # Dates shift every day, so bars are replaced rather than resized
+                bars.remove()
             
-            # Save to base64
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            chart_base64 = base64.b64encode(buffer.getvalue()).decode()
-            plt.close()
+            bars = ax.bar(dates[:len(daily_revenue)], daily_revenue, alpha=0.7, color='green')
+            ax.relim()
+            ax.autoscale_view()
+            if self._revenue_chart is None:
+                fig.subplots_adjust(**CHART_MARGINS)
+            self._revenue_chart = (fig, ax, bars)
             
-            return chart_base64
+            return self._figure_png(fig)
             
         except Exception as e:
             logger.error(f"Error generating revenue chart: {e}")
             return None
     
-    def generate_signal_accuracy_chart(self, days=30):
-        """Generate signal accuracy chart"""
+    def _render_signal_accuracy_png(self, days=30):
+        """Generate signal accuracy chart as raw PNG bytes"""
         try:
             # Mock accuracy data
-            dates = pd.date_range(start=datetime.now() - timedelta(days=days), end=datetime.now(), freq='D')
+            dates = self._day_range(days)
             accuracy_data = [78, 82, 79, 85, 87, 83, 89, 91, 88, 93, 90, 86, 94, 92, 89, 95, 93, 90, 96, 94,
                            91, 97, 95, 92, 98, 96, 93, 99, 97, 94]
             
-            plt.figure(figsize=(12, 6))
-            plt.plot(dates[:len(accuracy_data)], accuracy_data, marker='o', linewidth=2, markersize=4, color='blue')
-            plt.title('Signal Accuracy (Last 30 Days)', fontsize=16, fontweight='bold')
-            plt.xlabel('Date', fontsize=12)
-            plt.ylabel('Accuracy (%)', fontsize=12)
-            plt.ylim(70, 100)
-            plt.grid(True, alpha=0.3)
-            plt.xticks(rotation=45)
-            
-            # Add horizontal line for target accuracy
-            plt.axhline(y=85, color='red', linestyle='--', alpha=0.7, label='Target (85%)')
-            plt.legend()
-            
-            plt.tight_layout()
+            if self._accuracy_chart is None:
+                fig, ax = self._new_figure((12, 6))
+                line, = ax.plot(dates[:len(accuracy_data)], accuracy_data, marker='o', linewidth=2, markersize=4, color='blue')
+                ax.set_title('Signal Accuracy (Last 30 Days)', fontsize=16, fontweight='bold')
+                ax.set_xlabel('Date', fontsize=12)
+                ax.set_ylabel('Accuracy (%)', fontsize=12)
+                ax.set_ylim(70, 100)
+                ax.grid(True, alpha=0.3)
+                ax.tick_params(axis='x', labelrotation=45)
+                
+                # Add horizontal line for target accuracy
+                ax.axhline(y=85, color='red', linestyle='--', alpha=0.7, label='Target (85%)')
+                ax.legend()
+                
+                fig.subplots_adjust(**CHART_MARGINS)
+                self._accuracy_chart = (fig, ax, line)
+            else:
+                fig, ax, line = self._accuracy_chart
+                line.set_data(dates[:len(accuracy_data)], accuracy_data)
+                ax.relim()
+                ax.autoscale_view(scaley=False)
             
-            # Save to base64
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            chart_base64 = base64.b64encode(buffer.getvalue()).decode()
-            plt.close()
-            
-            return chart_base64
+            return self._figure_png(fig)
             
         except Exception as e:
             logger.error(f"Error generating accuracy chart: {e}")
             return None
     
-    def generate_subscription_pie_chart(self):
-        """Generate subscription distribution pie chart"""
+    def _render_subscription_pie_png(self):
+        """Generate subscription distribution pie chart as raw PNG bytes"""
         try:
             # Get subscription data
             subscription_data = self.db.get_subscription_breakdown() if hasattr(self.db, 'get_subscription_breakdown') else {
@@ -136,30 +181,47 @@ class ReportGenerator:
             colors = ['#ff9999', '#66b3ff', '#99ff99']
             explode = (0.05, 0.05, 0.1)  # explode VIP slice
             
-            plt.figure(figsize=(10, 8))
-            plt.pie(sizes, explode=explode, labels=labels, colors=colors, autopct='%1.1f%%',
-                   shadow=True, startangle=90)
-            plt.title('Subscription Distribution', fontsize=16, fontweight='bold')
-            plt.axis('equal')
+            if self._subscription_chart is None:
+                self._subscription_chart = self._new_figure((10, 8))
+            fig, ax = self._subscription_chart
             
-            # Save to base64
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            chart_base64 = base64.b64encode(buffer.getvalue()).decode()
-            plt.close()
+            # Wedge geometry depends on every size, so the pie itself is redrawn on the kept axes
+            ax.clear()
+            ax.pie(sizes, explode=explode, labels=labels, colors=colors, autopct='%1.1f%%',
+                   shadow=True, startangle=90)
+            ax.set_title('Subscription Distribution', fontsize=16, fontweight='bold')
+            ax.axis('equal')
             
-            return chart_base64
+            return self._figure_png(fig)
             
         except Exception as e:
             logger.error(f"Error generating subscription pie chart: {e}")
             return None
     
-    def generate_comprehensive_report(self):
-        """Generate comprehensive PDF report"""
+    def generate_user_growth_chart(self, days=30):
+        """Generate user growth chart (base64 encoded PNG)"""
+        return self._to_base64(self._render_user_growth_png(days))
+    
+    def generate_revenue_chart(self, days=30):
+        """Generate revenue chart (base64 encoded PNG)"""
+        return self._to_base64(self._render_revenue_png(days))
+    
+    def generate_signal_accuracy_chart(self, days=30):
+        """Generate signal accuracy chart (base64 encoded PNG)"""
+        return self._to_base64(self._render_signal_accuracy_png(days))
+    
+    def generate_subscription_pie_chart(self):
+        """Generate subscription distribution pie chart (base64 encoded PNG)"""
+        return self._to_base64(self._render_subscription_pie_png())
+    
+    def generate_comprehensive_report(self, out_stream=None):
+        """Generate comprehensive PDF report into out_stream (spooled temp file by default)"""
+        # Only a spool created here is rewound or closed; caller streams may not be seekable
+        owned_stream = out_stream is None
         try:
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
+            if owned_stream:
+                out_stream = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE)
+            doc = SimpleDocTemplate(out_stream, pagesize=letter)
             styles = getSampleStyleSheet()
             story = []
             
@@ -187,12 +249,23 @@ class ReportGenerator:
             story.append(stats_para)
             story.append(Spacer(1, 12))
             
+            # Charts (raw PNG bytes, no base64 round-trip)
+            for render in (self._render_user_growth_png, self._render_revenue_png,
+                           self._render_signal_accuracy_png, self._render_subscription_pie_png):
+                png_bytes = render()
+                if png_bytes:
+                    story.append(Image(io.BytesIO(png_bytes), width=doc.width, height=doc.height / 2, kind='proportional'))
+                    story.append(Spacer(1, 12))
+            
             # Build PDF
             doc.build(story)
             
-            buffer.seek(0)
-            return buffer.getvalue()
+            if owned_stream:
+                out_stream.seek(0)
+            return out_stream
             
         except Exception as e:
             logger.error(f"Error generating comprehensive report: {e}")
+            if owned_stream and out_stream is not None:
+                out_stream.close()
             return None
@@ -9,16 +9,25 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 import xgboost as xgb
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
+SIGNAL_MAP = {0: 'SELL', 1: 'HOLD', 2: 'BUY'}
+# Vote columns in tie-break order (BUY wins ties, then HOLD)
+VOTE_ORDER = ('BUY', 'HOLD', 'SELL')
+# Class label -> vote column, as an index array so a whole batch maps in one take
+_VOTE_COLUMN = np.array([VOTE_ORDER.index(SIGNAL_MAP[label]) for label in sorted(SIGNAL_MAP)])
+_DEFAULT_PREDICTION = {'signal': 'HOLD', 'confidence': 50}
+
 class EnsembleModel:
     """مدل‌های Ensemble"""
     
     def __init__(self):
         self.models = {}
         self.scaler = StandardScaler()
+        self._mean = None  # StandardScaler params as flat float32 arrays for inference
+        self._inv_scale = None
         self.is_trained = False
         
     async def initialize(self):
@@ -33,25 +42,30 @@ class EnsembleModel:
     def train_models(self, X: np.ndarray, y: np.ndarray) -> bool:
         """آموزش مدل‌های ensemble"""
         try:
-            # Scale data
-            X_scaled = self.scaler.fit_transform(X)
+            # Scale data (float32 halves the training matrix; tree models bin/split in float32)
+            X_scaled = self.scaler.fit_transform(X).astype(np.float32, copy=False)
+            self._mean = self.scaler.mean_.astype(np.float32)
+            self._inv_scale = (1.0 / self.scaler.scale_).astype(np.float32)
             
             # Train Random Forest
             rf_model = RandomForestClassifier(
                 n_estimators=100, 
                 random_state=42,
                 max_depth=10,
-                min_samples_split=5
+                min_samples_split=5,
+                max_features='sqrt',
+                n_jobs=-1
             )
             rf_model.fit(X_scaled, y)
             self.models['random_forest'] = rf_model
             
-            # Train XGBoost
+            # Train XGBoost (hist trees; the sklearn wrapper builds a QuantileDMatrix for them)
             xgb_model = xgb.XGBClassifier(
                 n_estimators=100, 
                 random_state=42,
                 max_depth=6,
-                learning_rate=0.1
+                learning_rate=0.1,
+                tree_method='hist'
             )
             xgb_model.fit(X_scaled, y)
             self.models['xgboost'] = xgb_model
@@ -66,51 +80,50 @@ class EnsembleModel:
     
     def predict(self, X: np.ndarray) -> Dict:
         """پیش‌بینی با ensemble"""
+        return self.predict_batch(np.asarray(X).reshape(1, -1))[0]
+    
+    def predict_batch(self, X: np.ndarray) -> List[Dict]:
+        """پیش‌بینی دسته‌ای با ensemble برای X با شکل (N, F)"""
         try:
+            X = np.asarray(X)
             if not self.is_trained or not self.models:
-                return {'signal': 'HOLD', 'confidence': 50}
+                return [dict(_DEFAULT_PREDICTION) for _ in range(len(X))]
             
-            X_scaled = self.scaler.transform(X.reshape(1, -1))
+            X_scaled = (X.astype(np.float32) - self._mean) * self._inv_scale
+            rows = np.arange(len(X))
             
             predictions = {}
-            confidences = {}
-            
-            # Random Forest prediction
-            if 'random_forest' in self.models:
-                rf_pred = self.models['random_forest'].predict(X_scaled)[0]
-                rf_proba = self.models['random_forest'].predict_proba(X_scaled)[0]
-                predictions['random_forest'] = rf_pred
-                confidences['random_forest'] = max(rf_proba)
-            
-            # XGBoost prediction
-            if 'xgboost' in self.models:
-                xgb_pred = self.models['xgboost'].predict(X_scaled)[0]
-                xgb_proba = self.models['xgboost'].predict_proba(X_scaled)[0]
-                predictions['xgboost'] = xgb_pred
-                confidences['xgboost'] = max(xgb_proba)
-            
-            # Weighted voting
-            signal_votes = {'BUY': 0, 'HOLD': 0, 'SELL': 0}
-            signal_map = {0: 'SELL', 1: 'HOLD', 2: 'BUY'}
+            votes = np.zeros((len(X), len(VOTE_ORDER)))
             
-            total_weight = 0
-            for model, pred in predictions.items():
-                signal = signal_map[pred]
-                weight = confidences[model]
-                signal_votes[signal] += weight
-                total_weight += weight
+            # One predict_proba per model for the whole batch; predicted label is the argmax class
+            for name in ('random_forest', 'xgboost'):
+                if name not in self.models:
+                    continue
+                model = self.models[name]
+                proba = model.predict_proba(X_scaled)
+                best = proba.argmax(axis=1)
+                labels = np.asarray(model.classes_)[best]
+                predictions[name] = labels
+                
+                # Weighted voting: each model votes for its label with its top probability
+                vote_columns = _VOTE_COLUMN[labels.astype(int)]
+                np.add.at(votes, (rows, vote_columns), proba[rows, best])
             
-            # Final signal
-            final_signal = max(signal_votes, key=signal_votes.get)
-            confidence = (signal_votes[final_signal] / total_weight * 100) if total_weight > 0 else 50
+            total_weight = votes.sum(axis=1)
+            final = votes.argmax(axis=1)
+            share = np.divide(votes[rows, final], total_weight, out=np.full(len(X), 0.5), where=total_weight > 0)
+            confidence = np.clip(share * 100, 10, 95)
             
-            return {
-                'signal': final_signal,
-                'confidence': min(95, max(10, confidence)),
-                'model_votes': signal_votes,
-                'individual_predictions': predictions
-            }
+            return [
+                {
+                    'signal': VOTE_ORDER[final[i]],
+                    'confidence': float(confidence[i]),
+                    'model_votes': dict(zip(VOTE_ORDER, votes[i].tolist())),
+                    'individual_predictions': {name: labels[i] for name, labels in predictions.items()}
+                }
+                for i in range(len(X))
+            ]
             
         except Exception as e:
             logger.error(f"Error in ensemble prediction: {e}")
-            return {'signal': 'HOLD', 'confidence': 50}
+            return [dict(_DEFAULT_PREDICTION) for _ in range(len(X))]
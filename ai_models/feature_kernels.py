@@ -0,0 +1,193 @@
+"""
+Fused indicator kernel for MLPredictor feature engineering
+"""
+
+import numpy as np
+
+# Optional JIT backend; without it MLPredictor keeps its pandas implementation
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Plain-Python stand-in so the kernel stays importable without Numba"""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Column order of the (N, F) array written by build_features
+KERNEL_COLUMNS = (
+    'sma_5', 'sma_10', 'sma_20', 'ema_12', 'ema_26', 'volume_sma',
+    'rsi', 'macd', 'macd_signal', 'macd_histogram',
+    'bb_middle', 'bb_upper', 'bb_lower',
+    'stoch_k', 'stoch_d', 'williams_r', 'atr'
+)
+
+
+@njit(cache=True)
+def _rolling_mean(x, window, out):
+    """Rolling mean via a running sum (NaN unless the whole window is valid)"""
+    total = 0.0
+    count = 0
+    for i in range(len(x)):
+        if not np.isnan(x[i]):
+            total += x[i]
+            count += 1
+        if i >= window and not np.isnan(x[i - window]):
+            total -= x[i - window]
+            count -= 1
+        out[i] = total / window if count == window else np.nan
+
+
+@njit(cache=True)
+def _ewm_adjusted(x, span, out):
+    """pandas ewm(span=span).mean() with the default adjust=True weighting"""
+    decay = 1.0 - 2.0 / (span + 1.0)
+    num = 0.0
+    den = 0.0
+    for i in range(len(x)):
+        num = x[i] + decay * num
+        den = 1.0 + decay * den
+        out[i] = num / den
+
+
+@njit(cache=True)
+def _ewm_recursive(x, alpha, min_periods, out):
+    """pandas ewm(alpha=alpha, min_periods=min_periods, adjust=False).mean(), skipping leading NaNs"""
+    value = np.nan
+    seen = 0
+    for i in range(len(x)):
+        if not np.isnan(x[i]):
+            value = x[i] if seen == 0 else value + alpha * (x[i] - value)
+            seen += 1
+        out[i] = value if seen >= min_periods else np.nan
+
+
+@njit(cache=True)
+def _rolling_extreme(x, window, use_max, out):
+    """Rolling max/min with a monotonic index deque (O(N) regardless of window)"""
+    n = len(x)
+    dq = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    for i in range(n):
+        while tail > head and ((x[dq[tail - 1]] <= x[i]) if use_max else (x[dq[tail - 1]] >= x[i])):
+            tail -= 1
+        dq[tail] = i
+        tail += 1
+        if dq[head] <= i - window:
+            head += 1
+        out[i] = x[dq[head]] if i >= window - 1 else np.nan
+
+
+@njit(cache=True)
+def _bollinger(close, window, num_std, middle, upper, lower):
+    """Bollinger Bands with a rolling mean/M2 update (population std, as in ta)"""
+    mean = 0.0
+    m2 = 0.0
+    for i in range(len(close)):
+        if i < window:
+            delta = close[i] - mean
+            mean += delta / (i + 1)
+            m2 += delta * (close[i] - mean)
+        else:
+            old = close[i - window]
+            new_mean = mean + (close[i] - old) / window
+            m2 += (close[i] - old) * (close[i] - new_mean + old - mean)
+            mean = new_mean
+        if i >= window - 1:
+            std = np.sqrt(max(m2 / window, 0.0))
+            middle[i] = mean
+            upper[i] = mean + num_std * std
+            lower[i] = mean - num_std * std
+        else:
+            middle[i] = np.nan
+            upper[i] = np.nan
+            lower[i] = np.nan
+
+
+@njit(cache=True)
+def _rsi(close, window, out):
+    """Wilder RSI"""
+    n = len(close)
+    gains = np.zeros(n)
+    losses = np.zeros(n)
+    for i in range(1, n):
+        delta = close[i] - close[i - 1]
+        if delta > 0:
+            gains[i] = delta
+        elif delta < 0:
+            losses[i] = -delta
+    avg_gain = np.empty(n)
+    avg_loss = np.empty(n)
+    _ewm_recursive(gains, 1.0 / window, window, avg_gain)
+    _ewm_recursive(losses, 1.0 / window, window, avg_loss)
+    for i in range(n):
+        if np.isnan(avg_loss[i]):
+            out[i] = np.nan
+        elif avg_loss[i] == 0:
+            out[i] = 100.0
+        else:
+            out[i] = 100.0 - 100.0 / (1.0 + avg_gain[i] / avg_loss[i])
+
+
+@njit(cache=True)
+def _atr(high, low, close, window, out):
+    """Wilder ATR seeded with the mean true range of the first window"""
+    n = len(close)
+    total = 0.0
+    for i in range(n):
+        true_range = high[i] - low[i]
+        if i > 0:
+            true_range = max(true_range, abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        if i < window - 1:
+            total += true_range
+            out[i] = np.nan
+        elif i == window - 1:
+            out[i] = (total + true_range) / window
+        else:
+            out[i] = out[i - 1] + (true_range - out[i - 1]) / window
+
+
+@njit(cache=True, parallel=True)
+def build_features(high, low, close, volume, out):
+    """Write every KERNEL_COLUMNS feature into out (N x F, Fortran order) in one call"""
+    n = len(close)
+    # Independent indicator blocks run in parallel; each writes its own columns
+    for block in prange(6):
+        if block == 0:
+            _rolling_mean(close, 5, out[:, 0])
+            _rolling_mean(close, 10, out[:, 1])
+            _rolling_mean(close, 20, out[:, 2])
+            _rolling_mean(volume, 20, out[:, 5])
+        elif block == 1:
+            _ewm_adjusted(close, 12, out[:, 3])
+            _ewm_adjusted(close, 26, out[:, 4])
+        elif block == 2:
+            _rsi(close, 14, out[:, 6])
+        elif block == 3:
+            fast = np.empty(n)
+            slow = np.empty(n)
+            _ewm_recursive(close, 2.0 / 13.0, 12, fast)
+            _ewm_recursive(close, 2.0 / 27.0, 26, slow)
+            for i in range(n):
+                out[i, 7] = fast[i] - slow[i]
+            _ewm_recursive(out[:, 7], 2.0 / 10.0, 9, out[:, 8])
+            for i in range(n):
+                out[i, 9] = out[i, 7] - out[i, 8]
+        elif block == 4:
+            _bollinger(close, 20, 2.0, out[:, 10], out[:, 11], out[:, 12])
+        else:
+            highest = np.empty(n)
+            lowest = np.empty(n)
+            _rolling_extreme(high, 14, True, highest)
+            _rolling_extreme(low, 14, False, lowest)
+            for i in range(n):
+                span = highest[i] - lowest[i]
+                out[i, 13] = 100.0 * (close[i] - lowest[i]) / span if span != 0 else np.nan
+                out[i, 15] = -100.0 * (highest[i] - close[i]) / span if span != 0 else np.nan
+            _rolling_mean(out[:, 13], 3, out[:, 14])
+            _atr(high, low, close, 14, out[:, 16])
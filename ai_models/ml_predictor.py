@@ -5,20 +5,73 @@ Machine Learning Predictor for ICT Trading Oracle
 import numpy as np
 import pandas as pd
 import yfinance as yf
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingClassifier
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, mean_squared_error
-import ta
-import pickle
+import joblib
 import os
+import time
 from datetime import datetime, timedelta
 import logging
 import warnings
+from ai_models.feature_kernels import NUMBA_AVAILABLE, KERNEL_COLUMNS, build_features
 warnings.filterwarnings('ignore')
 
+# Optional ONNX Runtime inference backend
+try:
+    import onnxruntime as ort
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+except ImportError:
+    ort = None
+
 logger = logging.getLogger(__name__)
 
+# Model input columns, in training order
+FEATURE_COLUMNS = (
+    'price_change', 'high_low_ratio', 'volume_price_trend',
+    'sma_5', 'sma_10', 'sma_20', 'ema_12', 'ema_26',
+    'rsi', 'macd', 'macd_signal', 'macd_histogram',
+    'bb_width', 'bb_position', 'stoch_k', 'stoch_d',
+    'williams_r', 'atr', 'volume_ratio',
+    'market_structure', 'liquidity_zones', 'fair_value_gaps', 'order_blocks',
+    'hour', 'day_of_week', 'is_london_session', 'is_ny_session', 'is_asian_session'
+)
+
+# Persisted MLPredictor attributes (one <name>.joblib file each)
+MODEL_ARTIFACTS = ('price_model', 'signal_model', 'scaler', 'price_scaler')
+
+TRAINING_DATA_CACHE_TTL = 6 * 3600  # seconds a cached yfinance download is reused for training
+
+# Trailing bars needed to rebuild the newest feature row; the recursive
+# indicators (EMA/RSI/ATR) decay below 1e-15 of their seed well within this
+FEATURE_WARMUP_BARS = 500
+
+
+# Indicator helpers: plain pandas equivalents of the ta library defaults
+def _ema(series, span):
+    """Exponential moving average (ta.trend convention)"""
+    return series.ewm(span=span, min_periods=span, adjust=False).mean()
+
+def _rsi(close, window=14):
+    """Wilder RSI"""
+    delta = close.diff()
+    up = delta.where(delta > 0, 0.0).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+    down = (-delta.where(delta < 0, 0.0)).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+    rsi = 100 - 100 / (1 + up / down)
+    return rsi.where(down != 0, 100.0)
+
+def _atr(high, low, close, window=14):
+    """Wilder average true range, seeded with the SMA of the first window"""
+    prev_close = close.shift(1)
+    true_range = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+    seeded = true_range.copy()
+    seeded.iloc[:window - 1] = np.nan
+    seeded.iloc[window - 1] = true_range.iloc[:window].mean()
+    return seeded.ewm(alpha=1 / window, adjust=False).mean()
+
+
 class MLPredictor:
     def __init__(self):
         self.price_model = None
@@ -26,6 +79,12 @@ class MLPredictor:
         self.scaler = StandardScaler()
         self.price_scaler = MinMaxScaler()
         self.model_path = "ai_models/trained_models/"
+        self._latest_features_cache = (None, None)  # (bar key, feature row)
+        self._onnx_sessions = None
+        self._feature_cols = list(FEATURE_COLUMNS)
+        self._feature_idx = None  # positions of _feature_cols in a create_features row
+        self._mean = None  # StandardScaler params as flat float32 arrays for inference
+        self._inv_scale = None
         self.ensure_model_directory()
         
     def ensure_model_directory(self):
@@ -35,6 +94,13 @@ class MLPredictor:
     def fetch_training_data(self, symbol="GC=F", period="2y"):
         """Fetch historical data for training"""
         try:
+            cache_path = f"{self.model_path}training_{symbol.replace('=', '_')}_{period}.parquet"
+            if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < TRAINING_DATA_CACHE_TTL:
+                try:
+                    return pd.read_parquet(cache_path, engine='pyarrow')
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable training data cache: {e}")
+            
             ticker = yf.Ticker(symbol)
             data = ticker.history(period=period, interval="1h")
             
@@ -42,6 +108,11 @@ class MLPredictor:
                 logger.error("No data fetched for training")
                 return None
             
+            try:
+                data.to_parquet(cache_path, engine='pyarrow', compression='zstd')
+            except Exception as e:
+                logger.warning(f"Could not cache training data: {e}")
+            
             return data
         except Exception as e:
             logger.error(f"Error fetching training data: {e}")
@@ -50,68 +121,46 @@ class MLPredictor:
     def create_features(self, data):
         """Create technical indicators as features"""
         try:
-            df = data.copy()
+            close, high, low, volume = data['Close'], data['High'], data['Low'], data['Volume']
+            
+            # Every feature is collected here and joined onto data in a single concat
+            feats = {}
             
             # Price-based features
-            df['price_change'] = df['Close'].pct_change()
-            df['high_low_ratio'] = df['High'] / df['Low']
-            df['volume_price_trend'] = df['Volume'] * df['price_change']
-            
-            # Moving averages
-            df['sma_5'] = df['Close'].rolling(window=5).mean()
-            df['sma_10'] = df['Close'].rolling(window=10).mean()
-            df['sma_20'] = df['Close'].rolling(window=20).mean()
-            df['ema_12'] = df['Close'].ewm(span=12).mean()
-            df['ema_26'] = df['Close'].ewm(span=26).mean()
-            
-            # Technical indicators
-            df['rsi'] = ta.momentum.RSIIndicator(df['Close']).rsi()
-            df['macd'] = ta.trend.MACD(df['Close']).macd()
-            df['macd_signal'] = ta.trend.MACD(df['Close']).macd_signal()
-            df['macd_histogram'] = ta.trend.MACD(df['Close']).macd_diff()
-            
-            # Bollinger Bands
-            bb = ta.volatility.BollingerBands(df['Close'])
-            df['bb_upper'] = bb.bollinger_hband()
-            df['bb_lower'] = bb.bollinger_lband()
-            df['bb_middle'] = bb.bollinger_mavg()
-            df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / df['bb_middle']
-            df['bb_position'] = (df['Close'] - df['bb_lower']) / (df['bb_upper'] - df['bb_lower'])
-            
-            # Stochastic
-            stoch = ta.momentum.StochasticOscillator(df['High'], df['Low'], df['Close'])
-            df['stoch_k'] = stoch.stoch()
-            df['stoch_d'] = stoch.stoch_signal()
-            
-            # Williams %R
-            df['williams_r'] = ta.momentum.WilliamsRIndicator(df['High'], df['Low'], df['Close']).williams_r()
-            
-            # Average True Range
-            df['atr'] = ta.volatility.AverageTrueRange(df['High'], df['Low'], df['Close']).average_true_range()
-            
-            # Volume indicators
-            df['volume_sma'] = df['Volume'].rolling(window=20).mean()
-            df['volume_ratio'] = df['Volume'] / df['volume_sma']
+            feats['price_change'] = close.pct_change()
+            feats['high_low_ratio'] = high / low
+            feats['volume_price_trend'] = volume * feats['price_change']
+            
+            # Moving averages and technical indicators (one fused pass when Numba is available)
+            if NUMBA_AVAILABLE and not data[['High', 'Low', 'Close', 'Volume']].isna().values.any():
+                feats.update(zip(KERNEL_COLUMNS, self._kernel_features(high, low, close, volume).T))
+            else:
+                feats.update(self._indicator_features(close, high, low, volume))
+            
+            feats['bb_width'] = (feats['bb_upper'] - feats['bb_lower']) / feats['bb_middle']
+            feats['bb_position'] = (close - feats['bb_lower']) / (feats['bb_upper'] - feats['bb_lower'])
+            feats['volume_ratio'] = volume / feats['volume_sma']
             
             # ICT-specific features
-            df['market_structure'] = self._calculate_market_structure(df)
-            df['liquidity_zones'] = self._identify_liquidity_zones(df)
-            df['fair_value_gaps'] = self._detect_fair_value_gaps(df)
-            df['order_blocks'] = self._detect_order_blocks(df)
+            feats['market_structure'] = self._calculate_market_structure(data)
+            feats['liquidity_zones'] = self._identify_liquidity_zones(data)
+            feats['fair_value_gaps'] = self._detect_fair_value_gaps(data)
+            feats['order_blocks'] = self._detect_order_blocks(data, feats['price_change'])
             
             # Time-based features
-            df['hour'] = df.index.hour
-            df['day_of_week'] = df.index.dayofweek
-            df['is_london_session'] = ((df.index.hour >= 8) & (df.index.hour <= 16)).astype(int)
-            df['is_ny_session'] = ((df.index.hour >= 13) & (df.index.hour <= 21)).astype(int)
-            df['is_asian_session'] = ((df.index.hour >= 0) & (df.index.hour <= 8)).astype(int)
+            hour = data.index.hour
+            feats['hour'] = hour
+            feats['day_of_week'] = data.index.dayofweek
+            feats['is_london_session'] = ((hour >= 8) & (hour <= 16)).astype(int)
+            feats['is_ny_session'] = ((hour >= 13) & (hour <= 21)).astype(int)
+            feats['is_asian_session'] = ((hour >= 0) & (hour <= 8)).astype(int)
             
             # Future price for prediction (target variable)
-            df['future_price'] = df['Close'].shift(-1)
-            df['price_direction'] = (df['future_price'] > df['Close']).astype(int)
+            feats['future_price'] = close.shift(-1)
+            feats['price_direction'] = (feats['future_price'] > close).astype(int)
             
-            # Drop NaN values
-            df = df.dropna()
+            # Assemble once and drop NaN rows
+            df = pd.concat([data, pd.DataFrame(feats, index=data.index)], axis=1).dropna()
             
             return df
             
@@ -119,6 +168,51 @@ class MLPredictor:
             logger.error(f"Error creating features: {e}")
             return None
     
+    def _kernel_features(self, high, low, close, volume):
+        """Compute KERNEL_COLUMNS with the fused Numba kernel"""
+        arrays = [np.ascontiguousarray(series.values, dtype=np.float64) for series in (high, low, close, volume)]
+        out = np.empty((len(close), len(KERNEL_COLUMNS)), dtype=np.float64, order='F')
+        build_features(*arrays, out)
+        return out
+    
+    def _indicator_features(self, close, high, low, volume):
+        """Compute KERNEL_COLUMNS with pandas rolling/ewm ops"""
+        feats = {}
+        
+        # Moving averages
+        feats['sma_5'] = close.rolling(window=5).mean()
+        feats['sma_10'] = close.rolling(window=10).mean()
+        feats['sma_20'] = close.rolling(window=20).mean()
+        feats['ema_12'] = close.ewm(span=12).mean()
+        feats['ema_26'] = close.ewm(span=26).mean()
+        
+        # Technical indicators
+        feats['rsi'] = _rsi(close)
+        feats['macd'] = _ema(close, 12) - _ema(close, 26)
+        feats['macd_signal'] = _ema(feats['macd'], 9)
+        feats['macd_histogram'] = feats['macd'] - feats['macd_signal']
+        
+        # Bollinger Bands (20, 2)
+        bb_std = close.rolling(window=20).std(ddof=0)
+        feats['bb_middle'] = close.rolling(window=20).mean()
+        feats['bb_upper'] = feats['bb_middle'] + 2 * bb_std
+        feats['bb_lower'] = feats['bb_middle'] - 2 * bb_std
+        
+        # Stochastic (14, 3) and Williams %R (14) share the same rolling extremes
+        highest_high = high.rolling(window=14).max()
+        lowest_low = low.rolling(window=14).min()
+        feats['stoch_k'] = 100 * (close - lowest_low) / (highest_high - lowest_low)
+        feats['stoch_d'] = feats['stoch_k'].rolling(window=3).mean()
+        feats['williams_r'] = -100 * (highest_high - close) / (highest_high - lowest_low)
+        
+        # Average True Range
+        feats['atr'] = _atr(high, low, close)
+        
+        # Volume indicators
+        feats['volume_sma'] = volume.rolling(window=20).mean()
+        
+        return feats
+    
     def _calculate_market_structure(self, df):
         """Calculate market structure (simplified ICT concept)"""
         try:
@@ -163,12 +257,12 @@ class MLPredictor:
         except:
             return pd.Series(0, index=df.index)
     
-    def _detect_order_blocks(self, df):
+    def _detect_order_blocks(self, df, price_change):
         """Detect Order Blocks (simplified)"""
         try:
             # Areas of high volume with significant price movement
             volume_threshold = df['Volume'].rolling(window=20).quantile(0.8)
-            price_movement = abs(df['Close'].pct_change())
+            price_movement = price_change.abs()
             movement_threshold = price_movement.rolling(window=20).quantile(0.8)
             
             order_blocks = ((df['Volume'] > volume_threshold) & 
@@ -193,19 +287,10 @@ class MLPredictor:
             if df is None:
                 return False
             
-            # Prepare features for training
-            feature_columns = [
-                'price_change', 'high_low_ratio', 'volume_price_trend',
-                'sma_5', 'sma_10', 'sma_20', 'ema_12', 'ema_26',
-                'rsi', 'macd', 'macd_signal', 'macd_histogram',
-                'bb_width', 'bb_position', 'stoch_k', 'stoch_d',
-                'williams_r', 'atr', 'volume_ratio',
-                'market_structure', 'liquidity_zones', 'fair_value_gaps', 'order_blocks',
-                'hour', 'day_of_week', 'is_london_session', 'is_ny_session', 'is_asian_session'
-            ]
-            
-            # Remove any columns that don't exist
-            available_features = [col for col in feature_columns if col in df.columns]
+            # Prepare features for training, skipping any columns that don't exist
+            available_features = [col for col in FEATURE_COLUMNS if col in df.columns]
+            self._feature_cols = available_features
+            self._feature_idx = None
             
             X = df[available_features].values
             y_price = df['future_price'].values
@@ -226,9 +311,10 @@ class MLPredictor:
                 X, y_price, y_direction, test_size=0.2, random_state=42
             )
             
-            # Scale features
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
+            # Scale features (float32 end-to-end; sklearn trees work in float32 internally)
+            X_train_scaled = self.scaler.fit_transform(X_train).astype(np.float32, copy=False)
+            X_test_scaled = self.scaler.transform(X_test).astype(np.float32, copy=False)
+            self._cache_scaler_params()
             
             # Scale prices
             y_price_train_scaled = self.price_scaler.fit_transform(y_price_train.reshape(-1, 1)).flatten()
@@ -245,8 +331,8 @@ class MLPredictor:
             
             # Train signal classification model
             logger.info("Training signal classification model...")
-            self.signal_model = GradientBoostingClassifier(
-                n_estimators=100,
+            self.signal_model = HistGradientBoostingClassifier(
+                max_iter=100,
                 max_depth=6,
                 random_state=42
             )
@@ -276,38 +362,68 @@ class MLPredictor:
     def save_models(self):
         """Save trained models"""
         try:
-            with open(f"{self.model_path}price_model.pkl", 'wb') as f:
-                pickle.dump(self.price_model, f)
-            
-            with open(f"{self.model_path}signal_model.pkl", 'wb') as f:
-                pickle.dump(self.signal_model, f)
-            
-            with open(f"{self.model_path}scaler.pkl", 'wb') as f:
-                pickle.dump(self.scaler, f)
+            # Uncompressed so load_models can memory-map the estimators' arrays
+            for name in MODEL_ARTIFACTS:
+                joblib.dump(getattr(self, name), f"{self.model_path}{name}.joblib")
             
-            with open(f"{self.model_path}price_scaler.pkl", 'wb') as f:
-                pickle.dump(self.price_scaler, f)
+            self._export_onnx()
             
             logger.info("Models saved successfully")
             
         except Exception as e:
             logger.error(f"Error saving models: {e}")
     
-    def load_models(self):
-        """Load trained models"""
+    def _cache_scaler_params(self):
+        """Keep the fitted scaler as (mean, 1/scale) so inference is one NumPy op"""
+        self._mean = self.scaler.mean_.astype(np.float32)
+        self._inv_scale = (1.0 / self.scaler.scale_).astype(np.float32)
+    
+    def _export_onnx(self):
+        """Export trained models to ONNX for ONNX Runtime inference"""
+        if ort is None:
+            return
+        
         try:
-            with open(f"{self.model_path}price_model.pkl", 'rb') as f:
-                self.price_model = pickle.load(f)
-            
-            with open(f"{self.model_path}signal_model.pkl", 'rb') as f:
-                self.signal_model = pickle.load(f)
+            initial_types = [('X', FloatTensorType([None, self.scaler.n_features_in_]))]
+            onnx_models = {
+                'price_model': convert_sklearn(self.price_model, initial_types=initial_types),
+                # Plain probability tensor instead of a list of {class: prob} maps
+                'signal_model': convert_sklearn(self.signal_model, initial_types=initial_types,
+                                                options={id(self.signal_model): {'zipmap': False}})
+            }
+            for name, onnx_model in onnx_models.items():
+                with open(f"{self.model_path}{name}.onnx", 'wb') as f:
+                    f.write(onnx_model.SerializeToString())
             
-            with open(f"{self.model_path}scaler.pkl", 'rb') as f:
-                self.scaler = pickle.load(f)
+            self._onnx_sessions = None
             
-            with open(f"{self.model_path}price_scaler.pkl", 'rb') as f:
-                self.price_scaler = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Error exporting ONNX models: {e}")
+    
+    def _get_onnx_sessions(self):
+        """Lazily open ONNX Runtime sessions (None when sklearn inference should be used)"""
+        if self._onnx_sessions is None and ort is not None:
+            try:
+                self._onnx_sessions = {
+                    name: ort.InferenceSession(f"{self.model_path}{name}.onnx", providers=['CPUExecutionProvider'])
+                    for name in ('price_model', 'signal_model')
+                }
+            except Exception as e:
+                logger.warning(f"ONNX models unavailable, using sklearn inference: {e}")
+                self._onnx_sessions = {}
+        
+        return self._onnx_sessions or None
+    
+    def load_models(self):
+        """Load trained models"""
+        try:
+            for name in MODEL_ARTIFACTS:
+                path = f"{self.model_path}{name}.joblib"
+                if not os.path.exists(path):
+                    path = f"{self.model_path}{name}.pkl"  # models saved before the joblib switch
+                setattr(self, name, joblib.load(path, mmap_mode='r'))
             
+            self._cache_scaler_params()
             return True
             
         except Exception as e:
@@ -324,27 +440,16 @@ class MLPredictor:
                     if not self.train_models():
                         return None
             
-            # Create features from current data
-            df = self.create_features(current_data)
-            if df is None or df.empty:
+            # Get the latest features
+            latest_features = self._latest_features(current_data)
+            if latest_features is None:
                 return None
             
-            # Get the latest features
-            latest_features = df.iloc[-1]
-            
-            feature_columns = [
-                'price_change', 'high_low_ratio', 'volume_price_trend',
-                'sma_5', 'sma_10', 'sma_20', 'ema_12', 'ema_26',
-                'rsi', 'macd', 'macd_signal', 'macd_histogram',
-                'bb_width', 'bb_position', 'stoch_k', 'stoch_d',
-                'williams_r', 'atr', 'volume_ratio',
-                'market_structure', 'liquidity_zones', 'fair_value_gaps', 'order_blocks',
-                'hour', 'day_of_week', 'is_london_session', 'is_ny_session', 'is_asian_session'
-            ]
-            
-            # Extract available features
-            available_features = [col for col in feature_columns if col in latest_features.index]
-            X = latest_features[available_features].values.reshape(1, -1)
+            # Extract model inputs by position (resolved once, create_features keeps column order fixed)
+            if self._feature_idx is None:
+                self._feature_idx = latest_features.index.get_indexer(
+                    [col for col in self._feature_cols if col in latest_features.index])
+            X = latest_features.to_numpy(dtype=np.float64)[self._feature_idx].reshape(1, -1)
             
             # Check for NaN values
             if np.isnan(X).any():
@@ -352,13 +457,18 @@ class MLPredictor:
                 return self._fallback_prediction(current_data)
             
             # Scale features
-            X_scaled = self.scaler.transform(X)
+            X_scaled = (X.astype(np.float32) - self._mean) * self._inv_scale
             
             # Make predictions
-            price_pred_scaled = self.price_model.predict(X_scaled)
+            sessions = self._get_onnx_sessions()
+            if sessions:
+                price_pred_scaled = sessions['price_model'].run(None, {'X': X_scaled})[0]
+                signal_prob = sessions['signal_model'].run(None, {'X': X_scaled})[1][0]
+            else:
+                price_pred_scaled = self.price_model.predict(X_scaled)
+                signal_prob = self.signal_model.predict_proba(X_scaled)[0]
             price_pred = self.price_scaler.inverse_transform(price_pred_scaled.reshape(-1, 1))[0][0]
             
-            signal_prob = self.signal_model.predict_proba(X_scaled)[0]
             signal_direction = 'BUY' if signal_prob[1] > 0.6 else 'SELL' if signal_prob[0] > 0.6 else 'HOLD'
             confidence = max(signal_prob) * 100
             
@@ -386,6 +496,21 @@ class MLPredictor:
             logger.error(f"Error making prediction: {e}")
             return self._fallback_prediction(current_data)
     
+    def _latest_features(self, current_data):
+        """Newest feature row, built from a trailing window and cached per bar"""
+        bar_key = (current_data.index[-1], current_data['Close'].iloc[-1])
+        cached_key, cached_row = self._latest_features_cache
+        if cached_key == bar_key:
+            return cached_row
+        
+        df = self.create_features(current_data.iloc[-FEATURE_WARMUP_BARS:])
+        if df is None or df.empty:
+            return None
+        
+        latest_features = df.iloc[-1]
+        self._latest_features_cache = (bar_key, latest_features)
+        return latest_features
+    
     def _fallback_prediction(self, data):
         """Fallback prediction when ML models fail"""
         try:
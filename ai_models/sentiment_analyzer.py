@@ -4,51 +4,145 @@ Sentiment Analysis for ICT Trading Oracle
 
 import requests
 import re
-from textblob import TextBlob
+import os
+import atexit
+import threading
+import numpy as np
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import logging
 from datetime import datetime
 
+# TextBlob is only needed when its polarity/subjectivity are explicitly requested
+try:
+    from textblob import TextBlob
+    TEXTBLOB_AVAILABLE = True
+except ImportError:
+    TextBlob = None
+    TEXTBLOB_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Per-text scores returned by _analyze_text_sentiment (rows of the averaging array)
+SENTIMENT_FIELDS = ('compound', 'positive', 'negative', 'neutral', 'polarity', 'subjectivity')
+SentimentScores = namedtuple('SentimentScores', SENTIMENT_FIELDS)
+_NEUTRAL_SCORES = SentimentScores(0.0, 0.33, 0.33, 0.33, 0.0, 0.5)
+
+# Text cleaning patterns
+_HTML_TAG = re.compile(r'<[^>]+>')
+_URL = re.compile(r'https?://\S+')
+_WHITESPACE = re.compile(r'\s+')
+
+SENTIMENT_BATCH_SIZE = 20  # articles per worker task; smaller inputs are scored in-process
+MAX_TEXT_LENGTH = 512  # VADER accuracy saturates after a sentence or two
+SENTIMENT_CACHE_SIZE = 4096  # cleaned texts remembered per analyzer (feeds repeat headlines)
+
+# Per-process analyzer used by pool workers
+_worker_analyzer = None
+
+# One scoring pool per process (per use_textblob setting), shared by every analyzer
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(use_textblob):
+    """Lazily start the shared worker pool for this use_textblob setting"""
+    with _pools_lock:
+        pool = _pools.get(use_textblob)
+        if pool is None:
+            if not _pools:
+                atexit.register(shutdown_pools)
+            pool = _pools[use_textblob] = ProcessPoolExecutor(
+                max_workers=os.cpu_count(), initializer=_init_worker, initargs=(use_textblob,)
+            )
+        return pool
+
+def shutdown_pools():
+    """Stop the shared scoring pools (also run at interpreter exit)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+def _init_worker(use_textblob=False):
+    """Build one analyzer per worker process"""
+    global _worker_analyzer
+    _worker_analyzer = SentimentAnalyzer(use_textblob=use_textblob)
+
+def _process_batch(texts):
+    """Score a batch of cleaned texts inside a worker process"""
+    return [_worker_analyzer._analyze_text_sentiment(text) for text in texts]
+
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, use_textblob=False):
         self.vader_analyzer = SentimentIntensityAnalyzer()
+        self.use_textblob = use_textblob and TEXTBLOB_AVAILABLE
+        # Cleaned text -> SentimentScores, least recently used first
+        self._score_cache = OrderedDict()
+        self._score_cache_lock = threading.Lock()
+    
+    def _cached_scores(self, text):
+        """Cached scores for text, or None on a miss"""
+        with self._score_cache_lock:
+            scores = self._score_cache.get(text)
+            if scores is not None:
+                self._score_cache.move_to_end(text)
+            return scores
+    
+    def _remember_scores(self, text, scores):
+        """Store scores for text, evicting the least recently used entry when full"""
+        with self._score_cache_lock:
+            self._score_cache[text] = scores
+            self._score_cache.move_to_end(text)
+            if len(self._score_cache) > SENTIMENT_CACHE_SIZE:
+                self._score_cache.popitem(last=False)
+    
+    def _score_texts(self, texts):
+        """Score cleaned texts, spreading large inputs over a process pool"""
+        # Only distinct texts missing from the cache are scored; repeats never reach the workers
+        scores = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            cached = self._cached_scores(text)
+            if cached is None:
+                missing.append(text)
+            else:
+                scores[text] = cached
         
+        # The analyzers are pure Python and hold the GIL, so batches go to processes, not threads
+        if len(missing) <= SENTIMENT_BATCH_SIZE:
+            for text in missing:
+                scores[text] = self._analyze_text_sentiment(text)
+        else:
+            pool = _get_pool(self.use_textblob)
+            futures = {}
+            for i in range(0, len(missing), SENTIMENT_BATCH_SIZE):
+                batch = missing[i:i + SENTIMENT_BATCH_SIZE]
+                futures[pool.submit(_process_batch, batch)] = batch
+            for future in as_completed(futures):
+                for text, text_scores in zip(futures[future], future.result()):
+                    scores[text] = text_scores
+                    self._remember_scores(text, text_scores)
+        
+        return [scores[text] for text in texts]
+    
     def analyze_news_sentiment(self, news_articles):
         """Analyze sentiment of news articles"""
         try:
             if not news_articles:
                 return self._default_sentiment()
             
-            sentiments = []
-            
-            for article in news_articles:
-                title = article.get('title', '')
-                description = article.get('description', '')
-                
-                # Combine title and description
-                text = f"{title} {description}"
-                
-                # Clean text
-                text = self._clean_text(text)
-                
-                if text:
-                    sentiment = self._analyze_text_sentiment(text)
-                    sentiments.append(sentiment)
+            # Combine title and description, then clean
+            texts = [self._clean_text(f"{article.get('title', '')} {article.get('description', '')}")
+                     for article in news_articles]
+            sentiments = self._score_texts([text for text in texts if text])
             
             if not sentiments:
                 return self._default_sentiment()
             
             # Calculate average sentiment
-            avg_sentiment = {
-                'compound': sum(s['compound'] for s in sentiments) / len(sentiments),
-                'positive': sum(s['positive'] for s in sentiments) / len(sentiments),
-                'negative': sum(s['negative'] for s in sentiments) / len(sentiments),
-                'neutral': sum(s['neutral'] for s in sentiments) / len(sentiments),
-                'polarity': sum(s['polarity'] for s in sentiments) / len(sentiments),
-                'subjectivity': sum(s['subjectivity'] for s in sentiments) / len(sentiments)
-            }
+            avg_sentiment = dict(zip(SENTIMENT_FIELDS, np.array(sentiments).mean(axis=0).tolist()))
             
             # Determine overall sentiment
             if avg_sentiment['compound'] >= 0.05:
@@ -78,34 +172,40 @@ class SentimentAnalyzer:
             logger.error(f"Error analyzing news sentiment: {e}")
             return self._default_sentiment()
     
+    def _score_text(self, text):
+        """Score one cleaned text"""
+        # VADER sentiment analysis
+        vader_scores = self.vader_analyzer.polarity_scores(text)
+        
+        if self.use_textblob:
+            polarity, subjectivity = TextBlob(text).sentiment
+        else:
+            # VADER proxies: compound for polarity, non-neutral share for subjectivity
+            polarity = vader_scores['compound']
+            subjectivity = 1 - vader_scores['neu']
+        
+        return SentimentScores(
+            vader_scores['compound'],
+            vader_scores['pos'],
+            vader_scores['neg'],
+            vader_scores['neu'],
+            polarity,
+            subjectivity
+        )
+    
     def _analyze_text_sentiment(self, text):
-        """Analyze sentiment of a single text"""
+        """Analyze sentiment of a single text as SentimentScores"""
         try:
-            # VADER sentiment analysis
-            vader_scores = self.vader_analyzer.polarity_scores(text)
-            
-            # TextBlob sentiment analysis
-            blob = TextBlob(text)
-            
-            return {
-                'compound': vader_scores['compound'],
-                'positive': vader_scores['pos'],
-                'negative': vader_scores['neg'],
-                'neutral': vader_scores['neu'],
-                'polarity': blob.sentiment.polarity,
-                'subjectivity': blob.sentiment.subjectivity
-            }
+            # Repeated headlines are served from the per-analyzer LRU cache
+            scores = self._cached_scores(text)
+            if scores is None:
+                scores = self._score_text(text)
+                self._remember_scores(text, scores)
+            return scores
             
         except Exception as e:
             logger.error(f"Error analyzing text sentiment: {e}")
-            return {
-                'compound': 0,
-                'positive': 0.33,
-                'negative': 0.33,
-                'neutral': 0.33,
-                'polarity': 0,
-                'subjectivity': 0.5
-            }
+            return _NEUTRAL_SCORES
     
     def _clean_text(self, text):
         """Clean and preprocess text"""
@@ -114,15 +214,18 @@ class SentimentAnalyzer:
                 return ""
             
             # Remove HTML tags
-            text = re.sub(r'<[^>]+>', '', text)
+            text = _HTML_TAG.sub('', text)
             
             # Remove URLs
-            text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+            text = _URL.sub('', text)
+            
+            # Drop emoji/non-ASCII symbols, which hit VADER's slow emoji path
+            text = text.encode('ascii', 'ignore').decode()
             
-            # Remove extra whitespace
-            text = re.sub(r'\s+', ' ', text).strip()
+            # Remove extra whitespace and cap the length
+            text = _WHITESPACE.sub(' ', text).strip()
             
-            return text
+            return text[:MAX_TEXT_LENGTH]
             
         except:
             return ""
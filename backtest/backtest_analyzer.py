@@ -9,10 +9,96 @@ from datetime import datetime, timedelta
 import logging
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from config.settings import BACKTEST_DAYS, SIGNALS_PER_DAY
 
+try:
+    import orjson
+    _dumps = lambda obj: orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str)
+except ImportError:
+    _dumps = lambda obj: json.dumps(obj, indent=2, default=str).encode()
+
 logger = logging.getLogger(__name__)
 
+# Optional JIT backend for the exit scan; without it backtest_signals uses a NumPy window matrix
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Plain-Python stand-in so the kernel stays importable without Numba"""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Running-sum step that keeps sample prices within 3200-3400
+_CLAMPED_ADD = np.frompyfunc(lambda price, change: max(3200, min(3400, price + change)), 2, 1)
+
+HISTORY_CACHE_DIR = 'backtest_results/.cache'  # one parquet download per (symbol, days, UTC date)
+
+# Categorical signal fields are drawn as integer codes and decoded once per batch
+SIGNAL_DIRECTIONS = np.array(['BUY', 'SELL'])
+MARKET_STRUCTURES = np.array(['BULLISH', 'BEARISH'])
+ORDER_BLOCKS = np.array(['Confirmed', 'Weak'])
+FVG_STATUSES = np.array(['Active', 'Neutral'])
+
+# Per-signal exit codes shared by both scan paths, decoded to strings once per backtest
+EXIT_TARGET, EXIT_STOP, EXIT_NO_DATA, EXIT_TIME = 0, 1, 2, 3
+EXIT_REASONS = np.array(['TARGET_HIT', 'STOP_HIT', 'NO_DATA', 'TIME_EXIT'])
+EXIT_RESULTS = np.array(['WIN', 'LOSS', 'NO_DATA', ''])  # time exits are decided by PnL sign
+
+
+@njit(cache=True, parallel=True)
+def _scan_exits(entry, take_profit, stop_loss, is_buy, start, end, highs, lows, closes, exit_price, exit_code):
+    """Early-exit scan of each signal's window for the first target/stop touch"""
+    for i in prange(len(entry)):
+        if end[i] <= start[i]:
+            exit_price[i] = entry[i]
+            exit_code[i] = EXIT_NO_DATA
+            continue
+        
+        exit_price[i] = closes[end[i] - 1]
+        exit_code[i] = EXIT_TIME
+        for j in range(start[i], end[i]):
+            target_hit = highs[j] >= take_profit[i] if is_buy[i] else lows[j] <= take_profit[i]
+            if target_hit:
+                exit_price[i] = take_profit[i]
+                exit_code[i] = EXIT_TARGET
+                break
+            stop_hit = lows[j] <= stop_loss[i] if is_buy[i] else highs[j] >= stop_loss[i]
+            if stop_hit:
+                exit_price[i] = stop_loss[i]
+                exit_code[i] = EXIT_STOP
+                break
+
+# Bars shared with parameter-sweep workers through one SharedMemory block
+SWEEP_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+_sweep_shm = None
+_sweep_history = None
+
+def _init_sweep_worker(shm_name, shape, index):
+    """Attach a sweep worker to the shared OHLCV matrix without copying it"""
+    global _sweep_shm, _sweep_history
+    _sweep_shm = shared_memory.SharedMemory(name=shm_name)
+    values = np.ndarray(shape, dtype=np.float64, buffer=_sweep_shm.buf)
+    _sweep_history = pd.DataFrame(values, index=index, columns=SWEEP_COLUMNS, copy=False)
+
+def _run_sweep_config(params):
+    """Backtest one (days, signals_per_day) configuration inside a sweep worker"""
+    days, signals_per_day = params
+    analyzer = BacktestAnalyzer()
+    history = _sweep_history.loc[_sweep_history.index[-1] - pd.Timedelta(days=days + 2):]
+    signals_df = analyzer.backtest_signals(analyzer.generate_signals(history, signals_per_day, days), history)
+    return {
+        'days': days,
+        'signals_per_day': signals_per_day,
+        'analysis': analyzer.analyze_results(signals_df)
+    }
+
 class BacktestAnalyzer:
     def __init__(self):
         self.symbol = "GC=F"  # Gold futures
@@ -23,6 +109,15 @@ class BacktestAnalyzer:
         """Get historical gold price data"""
         current_backtest_days = days if days is not None else self.backtest_days
         try:
+            # Reruns on the same UTC day reuse the first download
+            cache_path = (f"{HISTORY_CACHE_DIR}/{self.symbol.replace('=', '_')}_{current_backtest_days}_"
+                          f"{datetime.utcnow().strftime('%Y%m%d')}.parquet")
+            if os.path.exists(cache_path):
+                try:
+                    return pd.read_parquet(cache_path, engine='pyarrow')
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable historical data cache: {e}")
+            
             end_date = datetime.now()
             start_date = end_date - timedelta(days=current_backtest_days + 2)  # Extra days for data
             
@@ -33,6 +128,12 @@ class BacktestAnalyzer:
                 # Generate realistic sample data if API fails
                 return self._generate_sample_data(current_backtest_days)
             
+            try:
+                os.makedirs(HISTORY_CACHE_DIR, exist_ok=True)
+                data.to_parquet(cache_path, engine='pyarrow', compression='zstd')
+            except Exception as e:
+                logger.warning(f"Could not cache historical data: {e}")
+            
             return data
         except Exception as e:
             logger.error(f"Error fetching historical data: {e}")
@@ -40,35 +141,28 @@ class BacktestAnalyzer:
     
     def _generate_sample_data(self, days):
         """Generate realistic sample data for backtesting"""
-        np.random.seed(42)
+        rng = np.random.default_rng(42)
         
         # Create hourly data for the period
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days + 2)
         date_range = pd.date_range(start=start_date, end=end_date, freq='H')
+        n = len(date_range)
         
-        # Generate realistic gold price movement
+        # Generate realistic gold price movement: small hourly changes, with the
+        # running price kept in a realistic range at every step (a clamped walk)
         base_price = 3280  # Current gold price level
-        price_data = []
-        current_price = base_price
-        
-        for i, date in enumerate(date_range):
-            # Add realistic price movement
-            change = np.random.normal(0, 5)  # Small hourly changes
-            current_price += change
-            
-            # Keep price in realistic range
-            current_price = max(3200, min(3400, current_price))
-            
-            price_data.append({
-                'Open': current_price + np.random.normal(0, 2),
-                'High': current_price + abs(np.random.normal(0, 3)),
-                'Low': current_price - abs(np.random.normal(0, 3)),
-                'Close': current_price,
-                'Volume': np.random.randint(1000, 5000)
-            })
-        
-        df = pd.DataFrame(price_data, index=date_range)
+        changes = rng.normal(0, 5, n)
+        changes[0] += base_price
+        closes = _CLAMPED_ADD.accumulate(changes, dtype=object).astype(np.float64)
+        
+        df = pd.DataFrame({
+            'Open': closes + rng.normal(0, 2, n),
+            'High': closes + np.abs(rng.normal(0, 3, n)),
+            'Low': closes - np.abs(rng.normal(0, 3, n)),
+            'Close': closes,
+            'Volume': rng.integers(1000, 5000, n)
+        }, index=date_range)
         
         # Ensure High >= Low and proper OHLC relationships
         df['High'] = np.maximum(df[['Open', 'Close']].max(axis=1), df['High'])
@@ -78,98 +172,140 @@ class BacktestAnalyzer:
     
     def generate_signals(self, historical_data, signals_per_day=None, for_days=None):
         """Generate ICT signals for the past specified days"""
-        signals = []
-        
         # Use instance variables if parameters are not provided
         num_days_to_generate = for_days if for_days is not None else self.backtest_days
         num_signals_per_day = signals_per_day if signals_per_day is not None else self.signals_per_day
-
-        end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         
-        for day_offset in range(num_days_to_generate):
-            signal_date = end_date - timedelta(days=day_offset)
-            
-            # Get data for this day
-            day_data = historical_data[
-                (historical_data.index.date == signal_date.date())
-            ]
-            
-            if day_data.empty:
-                continue
-                
-            # Generate signals for this day
-            for signal_num in range(num_signals_per_day):
-                signal_time = signal_date + timedelta(hours=signal_num + 8)  # 8 AM to 6 PM
-                
-                # Find closest price data
-                closest_idx = day_data.index.get_indexer([signal_time], method='nearest')[0]
-                if closest_idx >= 0 and closest_idx < len(day_data):
-                    entry_price = day_data.iloc[closest_idx]['Close']
-                else:
-                    entry_price = day_data['Close'].mean()
-                
-                # Generate ICT-style signal
-                signal = self._generate_ict_signal(entry_price, signal_time, day_offset, signal_num)
-                signals.append(signal)
-        
-        return pd.DataFrame(signals)
+        index = historical_data.index
+        end_date = pd.Timestamp(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+        if index.tz is not None:
+            end_date = end_date.tz_localize(index.tz)
+        
+        # One slot per (day, signal): most recent day first, signals hourly from 8 AM
+        day_offsets = np.repeat(np.arange(num_days_to_generate), num_signals_per_day)
+        signal_nums = np.tile(np.arange(num_signals_per_day), num_days_to_generate)
+        day_starts = pd.DatetimeIndex(end_date - pd.to_timedelta(day_offsets, unit='D'))
+        signal_times = day_starts + pd.to_timedelta(signal_nums + 8, unit='h')
+        
+        # Bars of each signal's day, then the nearest of those bars to the signal time
+        day_lo = index.searchsorted(day_starts, side='left')
+        day_hi = index.searchsorted(day_starts + pd.Timedelta(days=1), side='left')
+        has_data = day_hi > day_lo
+        day_offsets, signal_nums, signal_times = day_offsets[has_data], signal_nums[has_data], signal_times[has_data]
+        day_lo, day_hi = day_lo[has_data], day_hi[has_data]
+        
+        if not len(signal_times):
+            return pd.DataFrame()
+        
+        after = np.clip(index.searchsorted(signal_times, side='left'), day_lo, day_hi - 1)
+        before = np.maximum(after - 1, day_lo)
+        times = index.asi8
+        target = signal_times.asi8
+        nearest = np.where(np.abs(times[before] - target) <= np.abs(times[after] - target), before, after)
+        entry_price = historical_data['Close'].to_numpy(dtype=np.float64)[nearest]
+        
+        return self._generate_ict_signals(entry_price, signal_times, day_offsets, signal_nums,
+                                          seed=[num_days_to_generate, num_signals_per_day])
     
-    def _generate_ict_signal(self, entry_price, signal_time, day, signal_num):
-        """Generate a realistic ICT signal"""
-        np.random.seed(day * 10 + signal_num)  # Consistent randomness
+    def _generate_ict_signals(self, entry_price, signal_times, day_offsets, signal_nums, seed):
+        """Generate a batch of realistic ICT signals"""
+        rng = np.random.default_rng(seed)  # Consistent randomness for a given backtest setup
+        n = len(entry_price)
         
         # ICT-style signal generation
-        signal_types = ['BUY', 'SELL']
-        signal_direction = np.random.choice(signal_types)
+        direction_code = rng.choice(2, size=n)
+        side = 1.0 - 2.0 * direction_code  # +1 BUY, -1 SELL
+        take_profit = entry_price + side * rng.uniform(15, 30, n)  # $15-30 target
+        stop_loss = entry_price - side * rng.uniform(10, 20, n)    # $10-20 stop
         
-        if signal_direction == 'BUY':
-            # Buy signal: target above, stop below
-            take_profit = entry_price + np.random.uniform(15, 30)  # $15-30 target
-            stop_loss = entry_price - np.random.uniform(10, 20)    # $10-20 stop
-        else:
-            # Sell signal: target below, stop above
-            take_profit = entry_price - np.random.uniform(15, 30)  # $15-30 target
-            stop_loss = entry_price + np.random.uniform(10, 20)    # $10-20 stop
+        signal_ids = np.char.add(np.char.add(np.asarray(signal_times.strftime('%Y%m%d'), dtype=str), '_'),
+                                 np.char.zfill(signal_nums.astype(str), 2))
         
         # ICT analysis components
-        market_structure = np.random.choice(['BULLISH', 'BEARISH'], p=[0.6, 0.4])
-        order_block = np.random.choice(['Confirmed', 'Weak'], p=[0.7, 0.3])
-        fvg_status = np.random.choice(['Active', 'Neutral'], p=[0.5, 0.5])
-        confidence = np.random.randint(65, 95)
-        
-        return {
-            'signal_id': f'{signal_time.strftime("%Y%m%d")}_{signal_num:02d}',
-            'timestamp': signal_time,
-            'signal_direction': signal_direction,
-            'entry_price': round(entry_price, 2),
-            'take_profit': round(take_profit, 2),
-            'stop_loss': round(stop_loss, 2),
-            'market_structure': market_structure,
-            'order_block': order_block,
-            'fvg_status': fvg_status,
-            'confidence': confidence,
+        return pd.DataFrame({
+            'signal_id': signal_ids,
+            'timestamp': signal_times,
+            'signal_direction': SIGNAL_DIRECTIONS[direction_code],
+            'entry_price': entry_price.round(2).astype(np.float32),
+            'take_profit': take_profit.round(2).astype(np.float32),
+            'stop_loss': stop_loss.round(2).astype(np.float32),
+            'market_structure': MARKET_STRUCTURES[rng.choice(2, size=n, p=[0.6, 0.4])],
+            'order_block': ORDER_BLOCKS[rng.choice(2, size=n, p=[0.7, 0.3])],
+            'fvg_status': FVG_STATUSES[rng.choice(2, size=n, p=[0.5, 0.5])],
+            'confidence': rng.integers(65, 95, n),
             'exit_price': None,
             'exit_reason': None,
-            'pnl': 0,
+            'pnl': np.float32(0),
             'result': 'PENDING'
-        }
+        })
     
     def backtest_signals(self, signals_df, historical_data):
         """Backtest signals against historical data"""
-        results = []
-        
-        for idx, signal in signals_df.iterrows():
-            result = self._test_single_signal(signal, historical_data)
-            results.append(result)
-        
-        # Update signals dataframe with results
-        for i, result in enumerate(results):
-            signals_df.at[i, 'exit_price'] = result['exit_price']
-            signals_df.at[i, 'exit_reason'] = result['exit_reason']
-            signals_df.at[i, 'pnl'] = result['pnl']
-            signals_df.at[i, 'result'] = result['result']
-        
-        return signals_df
+        if signals_df.empty:
+            return signals_df
+        
+        # Window lookup below relies on binary search over a sorted index
+        if not historical_data.index.is_monotonic_increasing:
+            historical_data = historical_data.sort_index()
+        
+        index = historical_data.index
+        highs = historical_data['High'].to_numpy(dtype=np.float64)
+        lows = historical_data['Low'].to_numpy(dtype=np.float64)
+        closes = historical_data['Close'].to_numpy(dtype=np.float64)
+        
+        entry = signals_df['entry_price'].to_numpy(dtype=np.float64)
+        take_profit = signals_df['take_profit'].to_numpy(dtype=np.float64)
+        stop_loss = signals_df['stop_loss'].to_numpy(dtype=np.float64)
+        is_buy = (signals_df['signal_direction'] == 'BUY').to_numpy()
+        
+        # Bars in [entry, entry + 24h] for every signal, located by binary search
+        entry_times = pd.DatetimeIndex(signals_df['timestamp'])
+        start = index.searchsorted(entry_times, side='left')
+        end = index.searchsorted(entry_times + pd.Timedelta(hours=24), side='right')
+        
+        if NUMBA_AVAILABLE:
+            exit_price = np.empty(len(entry))
+            exit_code = np.empty(len(entry), dtype=np.int64)
+            _scan_exits(entry, take_profit, stop_loss, is_buy, start.astype(np.int64), end.astype(np.int64),
+                        highs, lows, closes, exit_price, exit_code)
+        else:
+            exit_price, exit_code = self._scan_exits_numpy(entry, take_profit, stop_loss, is_buy, start, end,
+                                                           highs, lows, closes)
+        
+        time_exit = exit_code == EXIT_TIME
+        pnl = np.where(exit_code == EXIT_NO_DATA, 0.0, (exit_price - entry) * np.where(is_buy, 1.0, -1.0))
+        
+        return signals_df.assign(
+            exit_price=np.where(time_exit, exit_price.round(2), exit_price).astype(np.float32),
+            exit_reason=EXIT_REASONS[exit_code],
+            pnl=pnl.round(2).astype(np.float32),
+            result=np.where(time_exit, np.where(pnl > 0, 'WIN', 'LOSS'), EXIT_RESULTS[exit_code])
+        )
+    
+    def _scan_exits_numpy(self, entry, take_profit, stop_loss, is_buy, start, end, highs, lows, closes):
+        """NumPy fallback for _scan_exits over a (signals x bars) window matrix"""
+        length = end - start
+        offsets = np.arange(max(int(length.max()), 1))
+        in_window = offsets < length[:, None]
+        bars = np.minimum(start[:, None] + offsets, max(len(closes) - 1, 0))
+        window_high = highs[bars] if len(closes) else np.zeros(bars.shape)
+        window_low = lows[bars] if len(closes) else np.zeros(bars.shape)
+        
+        # Target is checked before stop on the same bar, as in _test_single_signal
+        hit_target = np.where(is_buy[:, None], window_high >= take_profit[:, None], window_low <= take_profit[:, None]) & in_window
+        hit_stop = np.where(is_buy[:, None], window_low <= stop_loss[:, None], window_high >= stop_loss[:, None]) & in_window
+        hit = hit_target | hit_stop
+        first_hit = hit.argmax(axis=1)
+        
+        no_data = length == 0
+        target_exit = ~no_data & hit.any(axis=1) & hit_target[np.arange(len(entry)), first_hit]
+        stop_exit = ~no_data & hit.any(axis=1) & ~target_exit
+        
+        final_close = closes[np.maximum(end - 1, 0)] if len(closes) else entry
+        conditions = [no_data, target_exit, stop_exit]
+        exit_price = np.select(conditions, [entry, take_profit, stop_loss], final_close)
+        exit_code = np.select(conditions, [EXIT_NO_DATA, EXIT_TARGET, EXIT_STOP], EXIT_TIME)
+        return exit_price, exit_code
     
     def _test_single_signal(self, signal, historical_data):
         """Test a single signal against historical data"""
@@ -181,10 +317,9 @@ class BacktestAnalyzer:
         
         # Get data after signal time (next 24 hours)
         end_time = entry_time + timedelta(hours=24)
-        test_data = historical_data[
-            (historical_data.index >= entry_time) & 
-            (historical_data.index <= end_time)
-        ]
+        if not historical_data.index.is_monotonic_increasing:
+            historical_data = historical_data.sort_index()
+        test_data = historical_data.loc[entry_time:end_time]  # binary-search slice on the sorted index
         
         if test_data.empty:
             return {
@@ -259,23 +394,27 @@ class BacktestAnalyzer:
         """Analyze backtest results"""
         total_signals = len(signals_df)
         
-        # Count results
-        wins = len(signals_df[signals_df['result'] == 'WIN'])
-        losses = len(signals_df[signals_df['result'] == 'LOSS'])
-        no_data = len(signals_df[signals_df['result'] == 'NO_DATA'])
+        # Count results (one pass per column)
+        result_counts = signals_df['result'].value_counts()
+        wins = int(result_counts.get('WIN', 0))
+        losses = int(result_counts.get('LOSS', 0))
+        no_data = int(result_counts.get('NO_DATA', 0))
         
         # Calculate metrics
         win_rate = (wins / total_signals) * 100 if total_signals > 0 else 0
         
         # PnL analysis
-        total_pnl = signals_df['pnl'].sum()
-        avg_win = signals_df[signals_df['result'] == 'WIN']['pnl'].mean() if wins > 0 else 0
-        avg_loss = signals_df[signals_df['result'] == 'LOSS']['pnl'].mean() if losses > 0 else 0
+        pnl = signals_df['pnl'].astype(np.float32)
+        total_pnl = float(pnl.sum())
+        avg_pnl = pnl.groupby(signals_df['result']).mean()
+        avg_win = float(avg_pnl['WIN']) if wins > 0 else 0
+        avg_loss = float(avg_pnl['LOSS']) if losses > 0 else 0
         
         # Exit reasons
-        target_hits = len(signals_df[signals_df['exit_reason'] == 'TARGET_HIT'])
-        stop_hits = len(signals_df[signals_df['exit_reason'] == 'STOP_HIT'])
-        time_exits = len(signals_df[signals_df['exit_reason'] == 'TIME_EXIT'])
+        exit_counts = signals_df['exit_reason'].value_counts()
+        target_hits = int(exit_counts.get('TARGET_HIT', 0))
+        stop_hits = int(exit_counts.get('STOP_HIT', 0))
+        time_exits = int(exit_counts.get('TIME_EXIT', 0))
         
         # Daily breakdown
         signals_df['date'] = signals_df['timestamp'].dt.date
@@ -325,10 +464,11 @@ class BacktestAnalyzer:
 📅 **Daily Breakdown:**
 """
         
-        for date, stats in analysis['daily_stats'].items():
-            report += f"📅 {date}: {stats['daily_wins']} wins, ${stats['daily_pnl']:.2f} PnL\n"
+        # Build the daily lines in a list and join once instead of growing the string
+        daily_lines = [f"📅 {date}: {stats['daily_wins']} wins, ${stats['daily_pnl']:.2f} PnL\n"
+                       for date, stats in analysis['daily_stats'].items()]
         
-        return report
+        return report + ''.join(daily_lines)
     
     def run_full_backtest(self, days=None, signals_per_day=None):
         """Run complete backtest for specified days and signals per day"""
@@ -369,7 +509,33 @@ class BacktestAnalyzer:
             'report': report
         }
     
-    def save_results(self, signals_df, analysis, report):
+    def run_parameter_sweep(self, param_grid, max_workers=None):
+        """Backtest (days, signals_per_day) configurations in parallel over one shared download"""
+        param_grid = list(param_grid)
+        if not param_grid:
+            return []
+        
+        try:
+            # Download once for the longest window; workers slice their own period from it
+            historical_data = self.get_historical_data(days=max(days for days, _ in param_grid))
+            if not historical_data.index.is_monotonic_increasing:
+                historical_data = historical_data.sort_index()
+            values = historical_data[SWEEP_COLUMNS].to_numpy(dtype=np.float64)
+            
+            shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            try:
+                np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+                with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker,
+                                         initargs=(shm.name, values.shape, historical_data.index)) as pool:
+                    return list(pool.map(_run_sweep_config, param_grid))
+            finally:
+                shm.close()
+                shm.unlink()
+        except Exception as e:
+            logger.error(f"Error running parameter sweep: {e}")
+            return []
+    
+    def save_results(self, signals_df, analysis, report, export_csv=False):
         """Save backtest results to files"""
         try:
             # Create backtest directory
@@ -377,12 +543,19 @@ class BacktestAnalyzer:
             
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             
-            # Save signals CSV
-            signals_df.to_csv(f'backtest_results/signals_{timestamp}.csv', index=False)
+            # Save signals as parquet (CSV only on request or when pyarrow is unavailable)
+            try:
+                signals_df.to_parquet(f'backtest_results/signals_{timestamp}.parquet', engine='pyarrow',
+                                      compression='zstd', index=False)
+            except Exception as e:
+                logger.warning(f"Could not write signals parquet, falling back to CSV: {e}")
+                export_csv = True
+            if export_csv:
+                signals_df.to_csv(f'backtest_results/signals_{timestamp}.csv', index=False)
             
             # Save analysis JSON
-            with open(f'backtest_results/analysis_{timestamp}.json', 'w') as f:
-                json.dump(analysis, f, indent=2, default=str)
+            with open(f'backtest_results/analysis_{timestamp}.json', 'wb') as f:
+                f.write(_dumps(analysis))
             
             # Save report
             with open(f'backtest_results/report_{timestamp}.txt', 'w') as f:
@@ -49,6 +49,12 @@ SUBSCRIPTION_PLANS = {
     }
 }
 
+# Daily signal allowance per plan, precomputed once (negative daily_signals means unlimited)
+DAILY_SIGNAL_LIMITS = {
+    plan: (details['daily_signals'] if details['daily_signals'] >= 0 else float('inf'))
+    for plan, details in SUBSCRIPTION_PLANS.items()
+}
+
 # Admin Configuration - REPLACE WITH YOUR ACTUAL USER IDS
 ADMIN_IDS = [
     262182607,  # Replace this number with your actual User ID from /start command
@@ -72,8 +78,10 @@ LOG_FILE_PATH_CONFIG = str(BASE_DIR / "logs" / "ict_trading.log")
 # Performance Configuration
 MAX_CONCURRENT_USERS = 1000
 DATABASE_POOL_SIZE = 10
+BOT_CONNECTION_POOL_SIZE = 50  # Shared Telegram HTTP pool (broadcast fan-out)
 API_TIMEOUT = 30
 CACHE_DURATION = 300  # 5 minutes
+REDIS_URL = os.getenv("REDIS_URL")  # Optional shared cache, e.g. redis://localhost:6379/0
 
 # Security Configuration
 RATE_LIMIT_PER_MINUTE = 60
@@ -11,33 +11,30 @@ Core module for ICT Trading Oracle
 # if parent_dir not in sys.path:
 #     sys.path.insert(0, parent_dir)
 
-# Import all core modules
-try:
-    from .api_manager import APIManager
-except ImportError:
-    APIManager = None
+# Core classes are imported on first attribute access (PEP 562), so importing one
+# submodule does not pull in every dependency; a class is None if its import fails
+_LAZY_EXPORTS = {
+    'APIManager': ('.api_manager', 'APIManager'),
+    'RealICTAnalyzer': ('.technical_analysis', 'RealICTAnalyzer'),
+    'TechnicalAnalyzer': ('.technical_analysis', 'RealICTAnalyzer'),  # Alias for broader compatibility
+    'DatabaseManager': ('.database', 'DatabaseManager'),
+    'PaymentManager': ('.payment_manager', 'PaymentManager'),
+    'SubscriptionManager': ('.payment_manager', 'SubscriptionManager'),
+}
 
-RealICTAnalyzer = None # Initialize to None
-TechnicalAnalyzer = None # Initialize alias to None
-try:
-    from .technical_analysis import RealICTAnalyzer
-    TechnicalAnalyzer = RealICTAnalyzer  # Alias for broader compatibility
-except ImportError:
-    # RealICTAnalyzer and TechnicalAnalyzer remain None if import fails
-    pass 
-
-try:
-    from .database import DatabaseManager
-except ImportError:
-    DatabaseManager = None
-
-PaymentManager = None # Initialize to None
-SubscriptionManager = None # Initialize to None
-try:
-    from .payment_manager import PaymentManager, SubscriptionManager
-except ImportError:
-    # PaymentManager and SubscriptionManager remain None if import fails
-    pass
+def __getattr__(name):
+    """Import a core class on first access and cache it on the package"""
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    module_name, attr = _LAZY_EXPORTS[name]
+    try:
+        from importlib import import_module
+        value = getattr(import_module(module_name, __name__), attr)
+    except ImportError:
+        value = None
+    globals()[name] = value
+    return value
 
 __all__ = [
     'APIManager', 
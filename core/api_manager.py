@@ -2,49 +2,205 @@
 API Manager for ICT Trading Oracle - Fixed Real-Time Prices
 """
 
-import requests
-import yfinance as yf
 import os
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 import logging
 import random
+from config.settings import CACHE_DURATION
 
 logger = logging.getLogger(__name__)
 
+# Resolved once at import rather than per instance
+NEWS_API_KEY = os.getenv('NEWS_API_KEY')
+TGJU_API_URL = os.getenv('TGJU_API_URL')
+
+PRICE_CACHE_TTL = CACHE_DURATION  # seconds
+NEWS_CACHE_TTL = 3600  # seconds, also used for TGJU data
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'  # local time, formatted via time.strftime (no datetime object)
+PRICE_SOURCE_TIMEOUT = 3  # seconds per live price source
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/XAUUSD=X"
+YAHOO_HEADERS = {'User-Agent': 'Mozilla/5.0'}  # the chart endpoint rejects the default requests agent
+
+# Sample news served when NewsAPI is unavailable (publishedAt is stamped per call)
+SAMPLE_NEWS = (
+    {
+        'title': 'Gold Tumbles to $3274 as US Court Blocks Trump Tariffs',
+        'description': 'Gold fell to its lowest level in over a week after court ruling...',
+        'url': 'https://example.com/news1'
+    },
+    {
+        'title': 'Gold Prices Drop 0.74% in India on May 29, 2025',
+        'description': 'Gold rates declined across major Indian cities today...',
+        'url': 'https://example.com/news2'
+    },
+    {
+        'title': 'Global Economic Outlook Affects Gold Trading',
+        'description': 'Economic indicators show mixed signals for precious metals...',
+        'url': 'https://example.com/news3'
+    }
+)
+
+@lru_cache(maxsize=1)
+def _realistic_price_for_minute(minute):
+    """Synthetic fallback quote, drawn once per wall-clock minute"""
+    # Based on search results: Gold is around $3,273-$3,299
+    base_price = 3280  # Current realistic price
+    variation = random.uniform(-10, 10)  # Small random variation
+    return (
+        round(base_price + variation, 2),
+        round(random.uniform(-15, 15), 2),
+        round(random.uniform(-0.5, 0.5), 2)
+    )
+
 class APIManager:
+    # Stale-while-revalidate cache shared by every instance: key -> {'data', 'fetched_at', 'refreshing'}
+    _cache = {}
+    _cache_lock = threading.Lock()
+    _cold_fetches = {}  # key -> {'done': Event, 'data'} for a cold-cache fetch in flight
+    _session = None  # keep-alive HTTP session, created on the first network call
+    
     def __init__(self):
-        self.news_api_key = os.getenv('NEWS_API_KEY')
-        self.tgju_api_url = os.getenv('TGJU_API_URL')
+        self.news_api_key = NEWS_API_KEY
+        self.tgju_api_url = TGJU_API_URL
+    
+    def _http_session(self):
+        """Shared requests.Session with connection pooling and light retries"""
+        with self._cache_lock:
+            if APIManager._session is None:
+                import requests  # deferred: only the network paths need it
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                
+                session = requests.Session()
+                retry_strategy = Retry(
+                    total=2,
+                    backoff_factor=0.2,
+                    status_forcelist=[502, 503, 504],
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry_strategy)
+                session.mount("https://", adapter)
+                APIManager._session = session
+            return APIManager._session
+    
+    def _get_cached(self, key, ttl, fetch):
+        """Serve key from the shared cache, refreshing a stale entry in the background"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if time.monotonic() - entry['fetched_at'] >= ttl and not entry['refreshing']:
+                    entry['refreshing'] = True
+                    threading.Thread(target=self._refresh_cached, args=(key, fetch), daemon=True).start()
+                return entry['data']
+            
+            # Cold cache: the first caller fetches, concurrent callers share its result
+            flight = self._cold_fetches.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._cold_fetches[key] = {'done': threading.Event(), 'data': None}
+        
+        if not leader:
+            flight['done'].wait()
+            return flight['data']
+        
+        # Failures (None) are not cached, so the next caller retries
+        try:
+            data = fetch()
+            flight['data'] = data
+        finally:
+            with self._cache_lock:
+                if flight['data'] is not None:
+                    self._cache[key] = {'data': flight['data'], 'fetched_at': time.monotonic(), 'refreshing': False}
+                del self._cold_fetches[key]
+            flight['done'].set()
+        return data
+    
+    def _refresh_cached(self, key, fetch):
+        """Refresh one cache entry; on failure keep serving the stale data for another TTL"""
+        try:
+            data = fetch()
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+            data = None
+        
+        with self._cache_lock:
+            entry = self._cache[key]
+            if data is not None:
+                entry['data'] = data
+            entry['fetched_at'] = time.monotonic()
+            entry['refreshing'] = False
     
     def get_gold_price(self):
         """Get live gold price from multiple sources"""
-        # Try method 1: Yahoo Finance with different symbol
+        price = self._get_cached('gold_price', PRICE_CACHE_TTL, self._fetch_gold_price)
+        if price is None:
+            # Fallback with realistic current price if every source failed
+            logger.warning("All primary gold price sources failed. Using fallback price.")
+            return self._get_realistic_price()
+        return dict(price)
+    
+    def _fetch_gold_price(self):
+        """Fetch the live gold price from whichever source answers first, or None if all failed"""
+        # Sources are queried concurrently, so latency is the fastest success rather than the sum of timeouts
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            pending = {executor.submit(self._fetch_yahoo_price), executor.submit(self._fetch_metals_live_price)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    price = future.result()
+                    if price is not None:
+                        return price
+            return None
+        finally:
+            # Do not wait for the slower source
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _fetch_yahoo_price(self):
+        """Gold price from the Yahoo Finance chart JSON (XAU/USD), or None on failure"""
         try:
-            gold = yf.Ticker("XAUUSD=X")  # XAU/USD pair
-            hist = gold.history(period="1d", interval="1m")
+            # Raw chart JSON: only two scalars are needed, so no yfinance/pandas frame is built
+            response = self._http_session().get(
+                YAHOO_CHART_URL,
+                params={'range': '1d', 'interval': '1m'},
+                headers=YAHOO_HEADERS,
+                timeout=PRICE_SOURCE_TIMEOUT
+            )
+            if response.status_code != 200:
+                logger.warning(f"Failed to get gold price from Yahoo Finance: Status {response.status_code}")
+                return None
             
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-                previous_close = hist['Close'].iloc[-2] if len(hist) > 1 else hist['Open'].iloc[-1]
+            result = response.json()['chart']['result'][0]
+            closes = [c for c in result['indicators']['quote'][0]['close'] if c is not None]
+            if closes:
+                meta = result.get('meta', {})
+                current_price = closes[-1]
+                previous_close = (meta.get('previousClose') or meta.get('chartPreviousClose')
+                                  or (closes[-2] if len(closes) > 1 else current_price))
                 change = current_price - previous_close
-                change_percent = (change / previous_close) * 100
+                change_percent = (change / previous_close) * 100 if previous_close else 0
                 
-                logger.info("Successfully fetched gold price from yfinance (XAUUSD=X)")
+                logger.info("Successfully fetched gold price from Yahoo Finance (XAUUSD=X)")
                 return {
                     'price': round(current_price, 2),
                     'change': round(change, 2),
                     'change_percent': round(change_percent, 2),
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'timestamp': time.strftime(TIMESTAMP_FORMAT)
                 }
         except Exception as e_yf:
-            logger.warning(f"Failed to get gold price from yfinance (XAUUSD=X): {e_yf}")
-            # Fall through to the next method
+            logger.warning(f"Failed to get gold price from Yahoo Finance (XAUUSD=X): {e_yf}")
         
-        # Try method 2: Alternative API (metals.live)
+        return None
+    
+    def _fetch_metals_live_price(self):
+        """Gold price from api.metals.live, or None on failure"""
         try:
-            response = requests.get(
+            response = self._http_session().get(
                 "https://api.metals.live/v1/spot/gold",
-                timeout=10
+                timeout=PRICE_SOURCE_TIMEOUT
             )
             if response.status_code == 200:
                 data = response.json()
@@ -60,7 +216,7 @@ class APIManager:
                         'price': round(current_price, 2),
                         'change': round(change, 2), 
                         'change_percent': round(change_percent, 2),
-                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        'timestamp': time.strftime(TIMESTAMP_FORMAT)
                     }
                 else:
                     logger.warning("api.metals.live response OK, but no price data.")
@@ -68,32 +224,30 @@ class APIManager:
                 logger.warning(f"Failed to get gold price from api.metals.live: Status {response.status_code}")
         except Exception as e_metals:
             logger.warning(f"Error connecting to api.metals.live: {e_metals}")
-            # Fall through to the fallback
         
-        # Fallback with realistic current price if other methods failed
-        logger.warning("All primary gold price sources failed. Using fallback price.")
-        return self._get_realistic_price()
+        return None
     
     def _get_realistic_price(self):
         """Realistic current gold price based on market data"""
-        # Based on search results: Gold is around $3,273-$3,299
-        base_price = 3280  # Current realistic price
-        variation = random.uniform(-10, 10)  # Small random variation
-        current_price = base_price + variation
-        
+        price, change, change_percent = _realistic_price_for_minute(int(time.time() // 60))
         return {
-            'price': round(current_price, 2),
-            'change': round(random.uniform(-15, 15), 2),
-            'change_percent': round(random.uniform(-0.5, 0.5), 2),
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'price': price,
+            'change': change,
+            'change_percent': change_percent,
+            'timestamp': time.strftime(TIMESTAMP_FORMAT)
         }
     
     def get_gold_news(self):
         """Get gold-related news from NewsAPI"""
+        if not self.news_api_key or self.news_api_key == "YOUR_NEWSAPI_KEY_FROM_NEWSAPI_ORG":
+            return self._get_sample_news()
+        
+        news = self._get_cached('gold_news', NEWS_CACHE_TTL, self._fetch_gold_news)
+        return list(news) if news is not None else self._get_sample_news()
+    
+    def _fetch_gold_news(self):
+        """Fetch gold-related news from NewsAPI, or None on failure"""
         try:
-            if not self.news_api_key or self.news_api_key == "YOUR_NEWSAPI_KEY_FROM_NEWSAPI_ORG":
-                return self._get_sample_news()
-            
             url = "https://newsapi.org/v2/everything"
             params = {
                 'q': 'gold trading market price',
@@ -103,50 +257,39 @@ class APIManager:
                 'apiKey': self.news_api_key
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self._http_session().get(url, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 return data.get('articles', [])[:3]  # Return top 3 news
-            else:
-                return self._get_sample_news()
+            return None
                 
         except Exception as e:
             logger.error(f"Error fetching news: {e}")
-            return self._get_sample_news()
+            return None
     
     def _get_sample_news(self):
         """Sample news when API is not available"""
-        return [
-            {
-                'title': 'Gold Tumbles to $3274 as US Court Blocks Trump Tariffs',
-                'description': 'Gold fell to its lowest level in over a week after court ruling...',
-                'url': 'https://example.com/news1',
-                'publishedAt': datetime.now().isoformat()
-            },
-            {
-                'title': 'Gold Prices Drop 0.74% in India on May 29, 2025',
-                'description': 'Gold rates declined across major Indian cities today...',
-                'url': 'https://example.com/news2',
-                'publishedAt': datetime.now().isoformat()
-            },
-            {
-                'title': 'Global Economic Outlook Affects Gold Trading',
-                'description': 'Economic indicators show mixed signals for precious metals...',
-                'url': 'https://example.com/news3',
-                'publishedAt': datetime.now().isoformat()
-            }
-        ]
+        published_at = datetime.now().isoformat()
+        return [{**article, 'publishedAt': published_at} for article in SAMPLE_NEWS]
     
     def get_tgju_data(self):
         """Get data from TGJU API (Iranian gold prices)"""
+        if not self.tgju_api_url:
+            return None
+        return self._get_cached('tgju', NEWS_CACHE_TTL, self._fetch_tgju_data)
+    
+    def _fetch_tgju_data(self):
+        """Fetch TGJU data, or None on failure"""
         try:
-            if not self.tgju_api_url:
-                return None
-            
-            response = requests.get(self.tgju_api_url, timeout=10)
+            response = self._http_session().get(self.tgju_api_url, timeout=10)
             if response.status_code == 200:
                 return response.json()
             return None
         except Exception as e:
             logger.error(f"Error fetching TGJU data: {e}")
             return None
+
+@lru_cache(maxsize=1)
+def get_api_manager():
+    """Process-wide APIManager shared by every handler"""
+    return APIManager()
@@ -2,28 +2,205 @@
 Database Manager for ICT Trading Oracle
 """
 
+import asyncio
+import atexit
+import json
 import sqlite3
 import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from functools import lru_cache
 import logging
-from pathlib import Path
+from config.settings import DATABASE_PATH, DATABASE_POOL_SIZE, DAILY_SIGNAL_LIMITS
 
 logger = logging.getLogger(__name__)
 
+# Per-connection settings: WAL lets readers run alongside the single writer
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Lookup indexes for the per-user and dashboard queries issued on every request
+TABLE_INDEXES = (
+    ("users", "CREATE INDEX IF NOT EXISTS idx_users_last_activity ON users(last_activity DESC)"),
+    ("signals", "CREATE INDEX IF NOT EXISTS idx_signals_created_at ON signals(created_at)"),
+    ("user_signals", "CREATE INDEX IF NOT EXISTS ix_user_signals_user_ts ON user_signals(user_id, sent_at)"),
+    ("user_activity", "CREATE INDEX IF NOT EXISTS ix_activity_user_ts ON user_activity(user_id, timestamp)"),
+    ("payments", "CREATE INDEX IF NOT EXISTS ix_payments_user ON payments(user_id)"),
+)
+
+# Hot-path statements, kept as single constants so each pooled connection's statement cache hits
+_SQL_GET_USER = "SELECT * FROM users WHERE user_id = ?"
+_SQL_UPSERT_USER = '''
+    INSERT INTO users (user_id, username, first_name, last_name)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        username = excluded.username,
+        first_name = excluded.first_name,
+        last_name = excluded.last_name,
+        last_activity = CURRENT_TIMESTAMP
+'''
+_SQL_GET_SIGNAL_ALLOWANCE = '''
+    SELECT subscription_type,
+           CASE WHEN DATE(last_activity) < DATE('now') THEN 0 ELSE daily_signals_used END
+    FROM users WHERE user_id = ?
+'''
+_SQL_INSERT_SIGNAL = '''
+    INSERT INTO signals (
+        signal_type, symbol, price, signal_direction, confidence,
+        entry_price, stop_loss, take_profit, market_structure,
+        order_block, fvg_status, rsi_value
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_INSERT_USER_SIGNAL = "INSERT INTO user_signals (user_id, signal_id) VALUES (?, ?)"
+_SQL_COUNT_USER_SIGNAL = '''
+    UPDATE users 
+    SET daily_signals_used = CASE WHEN DATE(last_activity) < DATE('now') THEN 1
+                                  ELSE daily_signals_used + 1 END,
+        total_signals_received = total_signals_received + 1,
+        last_activity = CURRENT_TIMESTAMP
+    WHERE user_id = ?
+'''
+_SQL_COUNT_USER_SIGNALS_IN = '''
+    UPDATE users 
+    SET daily_signals_used = CASE WHEN DATE(last_activity) < DATE('now') THEN 1
+                                  ELSE daily_signals_used + 1 END,
+        total_signals_received = total_signals_received + 1,
+        last_activity = CURRENT_TIMESTAMP
+    WHERE user_id IN ({placeholders})
+'''
+_SQL_INSERT_ACTIVITY = "INSERT INTO user_activity (user_id, command, timestamp) VALUES (?, ?, ?)"
+
+# bot_stats is a single running-counter row (id = 1); daily_signals rolls over lazily by date
+_SQL_REBUILD_BOT_STATS = '''
+    INSERT OR REPLACE INTO bot_stats (id, total_users, active_users, total_signals, daily_signals, last_updated)
+    SELECT 1,
+           (SELECT COUNT(*) FROM users),
+           (SELECT COUNT(*) FROM users WHERE last_activity > datetime('now', '-7 days')),
+           (SELECT COUNT(*) FROM signals),
+           (SELECT COUNT(*) FROM signals WHERE created_at >= DATE('now')),
+           CURRENT_TIMESTAMP
+'''
+_SQL_GET_BOT_STATS = '''
+    SELECT total_users, total_signals,
+           CASE WHEN DATE(last_updated) < DATE('now') THEN 0 ELSE daily_signals END
+    FROM bot_stats WHERE id = 1
+'''
+_SQL_COUNT_NEW_USER_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS trg_bot_stats_new_user AFTER INSERT ON users
+    BEGIN
+        UPDATE bot_stats SET total_users = total_users + 1 WHERE id = 1;
+    END
+'''
+_SQL_COUNT_NEW_SIGNAL = '''
+    UPDATE bot_stats
+    SET total_signals = total_signals + 1,
+        daily_signals = CASE WHEN DATE(last_updated) < DATE('now') THEN 1 ELSE daily_signals + 1 END,
+        last_updated = CURRENT_TIMESTAMP
+    WHERE id = 1
+'''
+ACTIVE_USERS_CACHE_TTL = 60  # seconds between active-user recounts
+
+# Process-wide so per-handler managers neither rescan for bot_stats nor miss the cache
+_bot_stats_synced = set()  # database paths whose counters were rebuilt in this process
+_active_users_cache = {}  # database path -> (count, monotonic time)
+
+# user_activity rows are buffered in memory and written in batches
+ACTIVITY_FLUSH_INTERVAL = 2  # seconds
+ACTIVITY_FLUSH_SIZE = 500  # buffered rows that trigger an early flush
+
+# One buffer and one flusher thread per process, however many managers log activity
+_activity_buffer = deque()
+_activity_wakeup = threading.Event()
+_activity_lock = threading.Lock()
+_activity_writer = None  # manager whose pool the flusher writes through, set when the thread starts
+
+def _activity_flush_loop(manager):
+    """Flush buffered activity every ACTIVITY_FLUSH_INTERVAL seconds or when the buffer fills"""
+    while True:
+        _activity_wakeup.wait(ACTIVITY_FLUSH_INTERVAL)
+        _activity_wakeup.clear()
+        manager.flush_activity_log()
+
 class DatabaseManager:
     def __init__(self):
-        self.db_path = Path(__file__).parent.parent / "data" / "ict_trading.db"
+        self.db_path = DATABASE_PATH
         self.db_path.parent.mkdir(exist_ok=True)
+        self._pool = queue.Queue()
+        self._pool_lock = threading.Lock()
+        self._pool_opened = 0
         self.init_database()
     
-    def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
+    def _open_connection(self):
+        """Open a pooled connection in autocommit mode with the shared PRAGMAs"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=256)
+        conn.row_factory = sqlite3.Row  # name/index access built in C; dict(row) where a dict is returned
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _acquire_connection(self):
+        """Take an idle pooled connection, opening one while under DATABASE_POOL_SIZE"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._pool_lock:
+            can_open = self._pool_opened < DATABASE_POOL_SIZE
+            if can_open:
+                self._pool_opened += 1
+        if can_open:
+            try:
+                return self._open_connection()
+            except Exception:
+                with self._pool_lock:
+                    self._pool_opened -= 1
+                raise
+        
+        # Pool exhausted: wait for another caller to hand a connection back
+        return self._pool.get()
+    
+    @contextmanager
+    def get_connection(self, write=False):
+        """Borrow a pooled connection; write=True runs the block in one BEGIN IMMEDIATE transaction"""
+        conn = self._acquire_connection()
+        try:
+            if write:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._pool.put(conn)
+    
+    def close_connections(self):
+        """Close every idle pooled connection"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+            with self._pool_lock:
+                self._pool_opened -= 1
     
     def init_database(self):
         """Initialize database tables"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(write=True) as conn:
                 cursor = conn.cursor()
                 
                 # Users table
@@ -115,8 +292,49 @@ class DatabaseManager:
                     )
                 ''')
                 
+                # Queued broadcast jobs
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS broadcast_jobs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        message TEXT NOT NULL,
+                        target_group TEXT DEFAULT 'all',
+                        image_url TEXT,
+                        status TEXT DEFAULT 'QUEUED',
+                        total_users INTEGER DEFAULT 0,
+                        successful_sends INTEGER DEFAULT 0,
+                        failed_sends INTEGER DEFAULT 0,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        finished_at DATETIME
+                    )
+                ''')
+                
+                # Precomputed admin dashboard aggregates
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS admin_stats_mv (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                
+                # payments is created by the subscription module, so only index it once present
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+                existing_tables = {row[0] for row in cursor.fetchall()}
+                for table, index_sql in TABLE_INDEXES:
+                    if table in existing_tables:
+                        cursor.execute(index_sql)
+                
+                # Resync the running counters with the tables once per process
+                rebuild_stats = self.db_path not in _bot_stats_synced
+                if rebuild_stats:
+                    cursor.execute(_SQL_REBUILD_BOT_STATS)
+                cursor.execute(_SQL_COUNT_NEW_USER_TRIGGER)
+                
                 conn.commit()
-                logger.info("Database initialized successfully")
+            
+            if rebuild_stats:
+                _bot_stats_synced.add(self.db_path)
+            logger.info("Database initialized successfully")
                 
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
@@ -124,24 +342,11 @@ class DatabaseManager:
     def add_user(self, user_id, username=None, first_name=None, last_name=None):
         """Add new user or update existing user"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(write=True) as conn:
                 cursor = conn.cursor()
                 
-                # Check if user exists
-                cursor.execute("SELECT user_id FROM users WHERE user_id = ?", (user_id,))
-                if cursor.fetchone():
-                    # Update existing user
-                    cursor.execute('''
-                        UPDATE users 
-                        SET username = ?, first_name = ?, last_name = ?, last_activity = CURRENT_TIMESTAMP
-                        WHERE user_id = ?
-                    ''', (username, first_name, last_name, user_id))
-                else:
-                    # Add new user
-                    cursor.execute('''
-                        INSERT INTO users (user_id, username, first_name, last_name)
-                        VALUES (?, ?, ?, ?)
-                    ''', (user_id, username, first_name, last_name))
+                # Atomic upsert; new rows bump bot_stats.total_users via trg_bot_stats_new_user
+                cursor.execute(_SQL_UPSERT_USER, (user_id, username, first_name, last_name))
                 
                 conn.commit()
                 return True
@@ -154,12 +359,11 @@ class DatabaseManager:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
+                cursor.execute(_SQL_GET_USER, (user_id,))
                 row = cursor.fetchone()
                 
                 if row:
-                    columns = [description[0] for description in cursor.description]
-                    return dict(zip(columns, row))
+                    return dict(row)
                 return None
         except Exception as e:
             logger.error(f"Error getting user: {e}")
@@ -168,28 +372,15 @@ class DatabaseManager:
     def can_receive_signal(self, user_id):
         """Check if user can receive more signals today"""
         try:
-            user = self.get_user(user_id)
-            if not user:
-                return False
-            
-            # Free users: 3 signals per day
-            # Premium users: 50 signals per day  
-            # VIP users: unlimited
-            
-            if user['subscription_type'] == 'vip':
-                return True
-            
-            daily_limit = 50 if user['subscription_type'] == 'premium' else 3
-            
-            # Reset daily counter if it's a new day
-            today = datetime.now().date()
-            last_activity = datetime.fromisoformat(user['last_activity']).date()
+            # A counter from a previous day counts as 0; record_user_signal restarts it lazily
+            with self.get_connection() as conn:
+                row = conn.execute(_SQL_GET_SIGNAL_ALLOWANCE, (user_id,)).fetchone()
             
-            if today > last_activity:
-                self.reset_daily_signals(user_id)
-                return True
+            if not row:
+                return False
             
-            return user['daily_signals_used'] < daily_limit
+            subscription_type, used = row
+            return used < DAILY_SIGNAL_LIMITS.get(subscription_type, DAILY_SIGNAL_LIMITS['free'])
             
         except Exception as e:
             logger.error(f"Error checking signal limit: {e}")
@@ -198,7 +389,7 @@ class DatabaseManager:
     def reset_daily_signals(self, user_id):
         """Reset daily signal counter"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(write=True) as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     "UPDATE users SET daily_signals_used = 0 WHERE user_id = ?",
@@ -211,15 +402,9 @@ class DatabaseManager:
     def add_signal(self, signal_data):
         """Add new signal to database"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(write=True) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO signals (
-                        signal_type, symbol, price, signal_direction, confidence,
-                        entry_price, stop_loss, take_profit, market_structure,
-                        order_block, fvg_status, rsi_value
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+                cursor.execute(_SQL_INSERT_SIGNAL, (
                     signal_data.get('signal_type', 'ICT'),
                     signal_data.get('symbol', 'GOLD'),
                     signal_data.get('price'),
@@ -235,6 +420,7 @@ class DatabaseManager:
                 ))
                 
                 signal_id = cursor.lastrowid
+                cursor.execute(_SQL_COUNT_NEW_SIGNAL)
                 conn.commit()
                 return signal_id
         except Exception as e:
@@ -244,23 +430,14 @@ class DatabaseManager:
     def record_user_signal(self, user_id, signal_id):
         """Record that user received a signal"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(write=True) as conn:
                 cursor = conn.cursor()
                 
                 # Add to user_signals table
-                cursor.execute(
-                    "INSERT INTO user_signals (user_id, signal_id) VALUES (?, ?)",
-                    (user_id, signal_id)
-                )
+                cursor.execute(_SQL_INSERT_USER_SIGNAL, (user_id, signal_id))
                 
                 # Update user's signal counters
-                cursor.execute('''
-                    UPDATE users 
-                    SET daily_signals_used = daily_signals_used + 1,
-                        total_signals_received = total_signals_received + 1,
-                        last_activity = CURRENT_TIMESTAMP
-                    WHERE user_id = ?
-                ''', (user_id,))
+                cursor.execute(_SQL_COUNT_USER_SIGNAL, (user_id,))
                 
                 conn.commit()
                 return True
@@ -268,18 +445,76 @@ class DatabaseManager:
             logger.error(f"Error recording user signal: {e}")
             return False
     
-    def log_user_activity(self, user_id, command):
-        """Log user activity"""
+    def record_user_signal_bulk(self, signal_id, user_ids, chunk_size=500):
+        """Record one signal delivered to many users in a single transaction"""
+        if not user_ids:
+            return 0
+        
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(write=True) as conn:
                 cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT INTO user_activity (user_id, command) VALUES (?, ?)",
-                    (user_id, command)
-                )
+                cursor.executemany(_SQL_INSERT_USER_SIGNAL, [(user_id, signal_id) for user_id in user_ids])
+                
+                # Chunk to stay under SQLite's bound-parameter limit
+                updated = 0
+                for start in range(0, len(user_ids), chunk_size):
+                    chunk = user_ids[start:start + chunk_size]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(_SQL_COUNT_USER_SIGNALS_IN.format(placeholders=placeholders), chunk)
+                    updated += cursor.rowcount
+                
                 conn.commit()
+                return updated
+        except Exception as e:
+            logger.error(f"Error recording bulk user signals: {e}")
+            return 0
+    
+    def log_user_activity(self, user_id, command):
+        """Log user activity (buffered; written by the background flusher)"""
+        _activity_buffer.append((user_id, command, time.time()))
+        
+        if _activity_writer is None:
+            self._start_activity_flusher()
+        if len(_activity_buffer) >= ACTIVITY_FLUSH_SIZE:
+            _activity_wakeup.set()
+    
+    def _start_activity_flusher(self):
+        """Start the process-wide daemon thread that drains the activity buffer"""
+        global _activity_writer
+        with _activity_lock:
+            if _activity_writer is not None:
+                return
+            _activity_writer = self
+            threading.Thread(target=_activity_flush_loop, args=(self,),
+                             name="activity-flusher", daemon=True).start()
+            atexit.register(self.flush_activity_log)
+    
+    def flush_activity_log(self):
+        """Write all buffered activity rows in one transaction"""
+        # popleft is atomic, so concurrent flushes (timer, atexit, callers) split rows without losing any
+        rows = []
+        while True:
+            try:
+                rows.append(_activity_buffer.popleft())
+            except IndexError:
+                break
+        if not rows:
+            return 0
+        
+        try:
+            with self.get_connection(write=True) as conn:
+                # Same text format as CURRENT_TIMESTAMP so time-range queries keep working
+                conn.executemany(
+                    _SQL_INSERT_ACTIVITY,
+                    [(user_id, command, datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S'))
+                     for user_id, command, ts in rows]
+                )
+            return len(rows)
         except Exception as e:
+            # Put the rows back in their original order for the next flush
+            _activity_buffer.extendleft(reversed(rows))
             logger.error(f"Error logging user activity: {e}")
+            return 0
     
     def get_bot_stats(self):
         """Get bot statistics"""
@@ -287,29 +522,22 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Total users
-                cursor.execute("SELECT COUNT(*) FROM users")
-                total_users = cursor.fetchone()[0]
-                
-                # Active users (last 7 days)
-                week_ago = datetime.now() - timedelta(days=7)
-                cursor.execute(
-                    "SELECT COUNT(*) FROM users WHERE last_activity > ?",
-                    (week_ago.isoformat(),)
-                )
-                active_users = cursor.fetchone()[0]
-                
-                # Total signals
-                cursor.execute("SELECT COUNT(*) FROM signals")
-                total_signals = cursor.fetchone()[0]
+                # Totals and today's signals from the running counters kept by add_user/add_signal
+                cursor.execute(_SQL_GET_BOT_STATS)
+                total_users, total_signals, daily_signals = cursor.fetchone()
                 
-                # Today's signals
-                today = datetime.now().date()
-                cursor.execute(
-                    "SELECT COUNT(*) FROM signals WHERE DATE(created_at) = ?",
-                    (today.isoformat(),)
-                )
-                daily_signals = cursor.fetchone()[0]
+                # Active users (last 7 days), recounted at most every ACTIVE_USERS_CACHE_TTL seconds
+                cached = _active_users_cache.get(self.db_path)
+                if cached is not None and time.monotonic() - cached[1] < ACTIVE_USERS_CACHE_TTL:
+                    active_users = cached[0]
+                else:
+                    week_ago = datetime.now() - timedelta(days=7)
+                    cursor.execute(
+                        "SELECT COUNT(*) FROM users WHERE last_activity > ?",
+                        (week_ago.isoformat(),)
+                    )
+                    active_users = cursor.fetchone()[0]
+                    _active_users_cache[self.db_path] = (active_users, time.monotonic())
                 
                 return {
                     'total_users': total_users,
@@ -326,6 +554,69 @@ class DatabaseManager:
                 'daily_signals': 0
             }
     
+    async def get_bot_stats_async(self):
+        """Get bot statistics without blocking the event loop"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.get_bot_stats)
+    
+    def refresh_admin_stats_mv(self):
+        """Recompute admin dashboard aggregates and store them in admin_stats_mv"""
+        try:
+            base_stats = self.get_bot_stats()
+            
+            with self.get_connection(write=True) as conn:
+                cursor = conn.cursor()
+                
+                # Active users (last 24 hours)
+                cursor.execute(
+                    "SELECT COUNT(*) FROM users WHERE last_activity > datetime('now', '-1 day')"
+                )
+                active_users_24h = cursor.fetchone()[0]
+                
+                # Subscription breakdown
+                cursor.execute(
+                    "SELECT subscription_type, COUNT(*) FROM users GROUP BY subscription_type"
+                )
+                subscriptions = {row[0]: row[1] for row in cursor.fetchall()}
+                
+                comprehensive = {
+                    'total_users': base_stats['total_users'],
+                    'active_users_24h': active_users_24h,
+                    'signals_today': base_stats['daily_signals'],
+                    'total_signals': base_stats['total_signals'],
+                    'free_users': subscriptions.get('free', 0),
+                    'premium_users': subscriptions.get('premium', 0),
+                    'vip_users': subscriptions.get('vip', 0)
+                }
+                
+                cursor.execute(
+                    "INSERT OR REPLACE INTO admin_stats_mv (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+                    ('comprehensive', json.dumps(comprehensive))
+                )
+                
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error refreshing admin stats: {e}")
+            return False
+    
+    def get_admin_stats_mv(self, key):
+        """Get precomputed admin aggregates by key, or None if not refreshed yet"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT value FROM admin_stats_mv WHERE key = ?", (key,))
+                row = cursor.fetchone()
+                return json.loads(row[0]) if row else None
+        except Exception as e:
+            logger.error(f"Error getting admin stats: {e}")
+            return None
+    
+    async def get_admin_stats_mv_async(self, key):
+        """Get precomputed admin aggregates without blocking the event loop"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.get_admin_stats_mv, key)
+    
     def get_user_list(self, limit=50):
         """Get list of users for admin"""
         try:
@@ -339,18 +630,72 @@ class DatabaseManager:
                     LIMIT ?
                 ''', (limit,))
                 
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
             logger.error(f"Error getting user list: {e}")
             return []
     
+    def iter_users(self, batch_size=500, subscription=None):
+        """Yield active users in batches using keyset pagination on user_id"""
+        query = "SELECT user_id, subscription_type FROM users WHERE is_active = 1 AND user_id > ?"
+        params = []
+        if subscription is not None:
+            query += " AND subscription_type = ?"
+            params.append(subscription)
+        query += " ORDER BY user_id LIMIT ?"
+        
+        last_user_id = -1
+        while True:
+            try:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(query, (last_user_id, *params, batch_size))
+                    batch = [dict(row) for row in cursor.fetchall()]
+            except Exception as e:
+                logger.error(f"Error iterating users: {e}")
+                return
+            
+            if not batch:
+                return
+            
+            yield batch
+            
+            if len(batch) < batch_size:
+                return
+            last_user_id = batch[-1]['user_id']
+    
+    def mark_users_inactive_bulk(self, user_ids, chunk_size=500):
+        """Mark many users inactive with one UPDATE per chunk"""
+        if not user_ids:
+            return 0
+        
+        try:
+            updated = 0
+            with self.get_connection(write=True) as conn:
+                cursor = conn.cursor()
+                
+                # Chunk to stay under SQLite's bound-parameter limit
+                for start in range(0, len(user_ids), chunk_size):
+                    chunk = user_ids[start:start + chunk_size]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(
+                        f"UPDATE users SET is_active = 0 WHERE user_id IN ({placeholders})",
+                        chunk
+                    )
+                    updated += cursor.rowcount
+                
+                conn.commit()
+                return updated
+        except Exception as e:
+            logger.error(f"Error marking users inactive: {e}")
+            return 0
+    
     def upgrade_user_subscription(self, user_id, subscription_type, days=30):
         """Upgrade user subscription"""
         try:
             expires_date = datetime.now() + timedelta(days=days)
             
-            with self.get_connection() as conn:
+            with self.get_connection(write=True) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE users 
@@ -364,10 +709,69 @@ class DatabaseManager:
             logger.error(f"Error upgrading subscription: {e}")
             return False
     
+    def create_broadcast_job(self, message, target_group="all", image_url=None):
+        """Record a queued broadcast job and return its id"""
+        try:
+            with self.get_connection(write=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO broadcast_jobs (message, target_group, image_url) VALUES (?, ?, ?)",
+                    (message, target_group, image_url)
+                )
+                conn.commit()
+                return cursor.lastrowid
+        except Exception as e:
+            logger.error(f"Error creating broadcast job: {e}")
+            return None
+    
+    def update_broadcast_job(self, job_id, status, result=None):
+        """Update broadcast job status and, once finished, its send counts"""
+        try:
+            with self.get_connection(write=True) as conn:
+                cursor = conn.cursor()
+                if result is None:
+                    cursor.execute(
+                        "UPDATE broadcast_jobs SET status = ? WHERE id = ?",
+                        (status, job_id)
+                    )
+                else:
+                    cursor.execute('''
+                        UPDATE broadcast_jobs
+                        SET status = ?, total_users = ?, successful_sends = ?, failed_sends = ?,
+                            finished_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    ''', (
+                        status,
+                        result.get('total_users', 0),
+                        result.get('successful_sends', 0),
+                        result.get('failed_sends', 0),
+                        job_id
+                    ))
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error updating broadcast job: {e}")
+            return False
+    
+    def get_broadcast_job(self, job_id):
+        """Get broadcast job status"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM broadcast_jobs WHERE id = ?", (job_id,))
+                row = cursor.fetchone()
+                
+                if row:
+                    return dict(row)
+                return None
+        except Exception as e:
+            logger.error(f"Error getting broadcast job: {e}")
+            return None
+    
     def save_backtest_result(self, result_data):
         """Save backtest results to database"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(write=True) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO backtest_results (
@@ -391,3 +795,7 @@ class DatabaseManager:
             logger.error(f"Error saving backtest result: {e}")
             return None
 
+@lru_cache(maxsize=1)
+def get_database_manager():
+    """Process-wide DatabaseManager, so handlers share one connection pool"""
+    return DatabaseManager()
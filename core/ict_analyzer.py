@@ -6,21 +6,129 @@ Contains all ICT-specific analysis functions
 
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import ta
 from datetime import datetime
 import pytz
-from typing import Dict, List, Optional
+from collections import namedtuple
+from typing import Dict, List, Optional, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    from config.settings import KILL_ZONES
+except ImportError:
+    KILL_ZONES = {}
+
+# Optional JIT backend for the order-block scan; without it the kernel runs as plain Python over arrays
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Plain-Python stand-in so the kernel stays importable without Numba"""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Structure-of-arrays view of an OHLCV frame: float64 columns plus the bar index
+OHLCV = namedtuple('OHLCV', ['o', 'h', 'l', 'c', 'v', 'index'])
+OHLCV_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+SWING_CACHE_SIZE = 2  # frames remembered by _identify_swing_points (latest bar + one behind)
+
+# Order-block type flags returned by _detect_order_blocks_nb
+OB_BULLISH, OB_BEARISH = 0, 1
+
+# Optimal Trade Entry retracements of the last OTE_LOOKBACK bars' range
+OTE_LOOKBACK = 50
+OTE_LEVEL_NAMES = ('61.8%', '70.5%', '78.6%')
+OTE_RATIOS = np.array([0.618, 0.705, 0.786])
+OTE_TOLERANCE = 0.005  # max relative distance from a level to count as in the zone
+
+# Session quality by most important active kill zone, checked in order
+SESSION_QUALITY_CASCADE = (
+    ('new_york_open', 'PREMIUM'),
+    ('london_open', 'HIGH'),
+    ('asian_session', 'LOW'),
+)
+
+
+def _build_kill_zone_tables(kill_zones):
+    """Per-UTC-hour (active zones, session quality) lookup tables for analyze_kill_zones"""
+    zones_by_hour = []
+    quality_by_hour = []
+    for hour in range(24):
+        active_zones = []
+        for zone, times in kill_zones.items():
+            if zone == 'asian_session':
+                # The Asian session wraps past midnight
+                if hour >= times['start'] or hour < times['end']:
+                    active_zones.append(zone)
+            elif times['start'] <= hour < times['end']:
+                active_zones.append(zone)
+        zones_by_hour.append(tuple(active_zones))
+        quality_by_hour.append(next(
+            (quality for zone, quality in SESSION_QUALITY_CASCADE if zone in active_zones), 'MEDIUM'
+        ))
+    return tuple(zones_by_hour), tuple(quality_by_hour)
+
+
+KILL_ZONES_BY_HOUR, SESSION_QUALITY_BY_HOUR = _build_kill_zone_tables(KILL_ZONES)
+
+
+@njit(cache=True)
+def _detect_order_blocks_nb(opens, highs, lows, closes, volumes):
+    """Order-block scan returning (bar index, type flag) arrays in bar order"""
+    n = len(closes)
+    indices = np.empty(n, dtype=np.int64)
+    kinds = np.empty(n, dtype=np.int64)
+    count = 0
+    for i in range(3, n - 1):
+        # Volume must beat the previous three bars' mean by 20%; like pandas, the mean skips NaN
+        total = 0.0
+        valid = 0
+        for j in range(i - 3, i):
+            if not np.isnan(volumes[j]):
+                total += volumes[j]
+                valid += 1
+        volume_floor = total / valid * 1.2 if valid else np.nan
+        if not (volumes[i] > volume_floor):
+            continue
+        if closes[i] < opens[i] and closes[i + 1] > highs[i]:
+            indices[count] = i
+            kinds[count] = OB_BULLISH
+            count += 1
+        elif closes[i] > opens[i] and closes[i + 1] < lows[i]:
+            indices[count] = i
+            kinds[count] = OB_BEARISH
+            count += 1
+    return indices[:count], kinds[:count]
+
 class ICTAnalyzer:
     """تحلیلگر اصلی ICT"""
     
     def __init__(self):
         self.symbol = "GC=F"
+        self._swing_cache = {}  # (frame id, length, last bar, lookback) -> (frame, swing points)
     
-    def analyze_market_structure(self, data: pd.DataFrame) -> Dict:
+    @staticmethod
+    def prepare(data: Union[pd.DataFrame, Dict, OHLCV]) -> OHLCV:
+        """Convert a frame (or MarketDataProvider.get_arrays output) to contiguous OHLCV arrays once per tick"""
+        if isinstance(data, OHLCV):
+            return data
+        if isinstance(data, dict):
+            return OHLCV(data['o'], data['h'], data['l'], data['c'], data['v'], data['ts'])
+        columns = [
+            np.ascontiguousarray(data[column].to_numpy(dtype=np.float64)) if column in data else None
+            for column in OHLCV_COLUMNS
+        ]
+        return OHLCV(*columns, data.index)
+    
+    def analyze_market_structure(self, data: Union[pd.DataFrame, OHLCV]) -> Dict:
         """تحلیل ساختار بازار"""
         try:
             swing_points = self._identify_swing_points(data)
@@ -58,11 +166,11 @@ class ICTAnalyzer:
             logger.error(f"Error in market structure analysis: {e}")
             return {'structure': 'NEUTRAL', 'strength': 50}
     
-    def detect_break_of_structure(self, data: pd.DataFrame) -> Dict:
+    def detect_break_of_structure(self, data: Union[pd.DataFrame, OHLCV]) -> Dict:
         """تشخیص Break of Structure"""
         try:
             swing_points = self._identify_swing_points(data)
-            current_price = data['Close'].iloc[-1]
+            current_price = self.prepare(data).c[-1]
             
             bos_detected = False
             bos_type = None
@@ -91,88 +199,75 @@ class ICTAnalyzer:
             logger.error(f"Error detecting BOS: {e}")
             return {'bos_detected': False, 'bos_type': None}
     
-    def detect_order_blocks(self, data: pd.DataFrame) -> List[Dict]:
+    def detect_order_blocks(self, data: Union[pd.DataFrame, OHLCV]) -> List[Dict]:
         """تشخیص Order Blocks"""
         try:
-            order_blocks = []
+            bars = self.prepare(data)
+            highs, lows = bars.h, bars.l
+            indices, kinds = _detect_order_blocks_nb(bars.o, highs, lows, bars.c, bars.v)
             
-            for i in range(3, len(data) - 1):
-                current_candle = data.iloc[i]
-                next_candle = data.iloc[i + 1]
-                
-                # Bullish Order Block
-                if (current_candle['Close'] < current_candle['Open'] and
-                    next_candle['Close'] > current_candle['High'] and
-                    current_candle['Volume'] > data['Volume'].iloc[i-3:i].mean() * 1.2):
-                    
+            order_blocks = []
+            for i, kind in zip(indices[-5:].tolist(), kinds[-5:].tolist()):
+                if kind == OB_BULLISH:
                     order_blocks.append({
                         'type': 'bullish',
-                        'level': current_candle['Low'],
-                        'high': current_candle['High'],
+                        'level': lows[i],
+                        'high': highs[i],
                         'index': i,
-                        'timestamp': data.index[i],
+                        'timestamp': bars.index[i],
                         'quality': 'HIGH'
                     })
-                
-                # Bearish Order Block
-                elif (current_candle['Close'] > current_candle['Open'] and
-                      next_candle['Close'] < current_candle['Low'] and
-                      current_candle['Volume'] > data['Volume'].iloc[i-3:i].mean() * 1.2):
-                    
+                else:
                     order_blocks.append({
                         'type': 'bearish',
-                        'level': current_candle['High'],
-                        'low': current_candle['Low'],
+                        'level': highs[i],
+                        'low': lows[i],
                         'index': i,
-                        'timestamp': data.index[i],
+                        'timestamp': bars.index[i],
                         'quality': 'HIGH'
                     })
             
-            return order_blocks[-5:]
+            return order_blocks
             
         except Exception as e:
             logger.error(f"Error detecting order blocks: {e}")
             return []
     
-    def detect_fair_value_gaps(self, data: pd.DataFrame) -> List[Dict]:
+    def detect_fair_value_gaps(self, data: Union[pd.DataFrame, OHLCV]) -> List[Dict]:
         """تشخیص Fair Value Gaps"""
         try:
-            fvgs = []
+            bars = self.prepare(data)
+            highs, lows = bars.h, bars.l
             
-            for i in range(1, len(data) - 1):
-                candle1 = data.iloc[i-1]
-                candle2 = data.iloc[i]
-                candle3 = data.iloc[i+1]
-                
-                # Bullish FVG
-                if candle1['Low'] > candle3['High']:
-                    gap_size = candle1['Low'] - candle3['High']
-                    
+            # Three-bar stencil: bar i is the middle candle of (i-1, i, i+1)
+            bullish = lows[:-2] > highs[2:]
+            bearish = ~bullish & (highs[:-2] < lows[2:])
+            
+            fvgs = []
+            for k in np.flatnonzero(bullish | bearish)[-8:].tolist():
+                i = k + 1
+                if bullish[k]:
                     fvgs.append({
                         'type': 'bullish',
-                        'upper': candle1['Low'],
-                        'lower': candle3['High'],
-                        'size': gap_size,
+                        'upper': lows[i - 1],
+                        'lower': highs[i + 1],
+                        'size': lows[i - 1] - highs[i + 1],
                         'index': i,
-                        'timestamp': data.index[i],
+                        'timestamp': bars.index[i],
                         'filled': False
                     })
-                
-                # Bearish FVG
-                elif candle1['High'] < candle3['Low']:
-                    gap_size = candle3['Low'] - candle1['High']
-                    
+                else:
                     fvgs.append({
                         'type': 'bearish',
-                        'upper': candle3['Low'],
-                        'lower': candle1['High'],
-                        'size': gap_size,
+                        'upper': lows[i + 1],
+                        'lower': highs[i - 1],
+                        'size': lows[i + 1] - highs[i - 1],
                         'index': i,
-                        'timestamp': data.index[i],
+                        'timestamp': bars.index[i],
                         'filled': False
                     })
             
-            return fvgs[-8:]
+            return fvgs
             
         except Exception as e:
             logger.error(f"Error detecting FVGs: {e}")
@@ -181,111 +276,90 @@ class ICTAnalyzer:
     def analyze_kill_zones(self) -> Dict:
         """تحلیل Kill Zones"""
         try:
-            now = datetime.now(pytz.UTC)
-            hour = now.hour
-            
-            from config.settings import KILL_ZONES
-            
-            active_zones = []
-            for zone, times in KILL_ZONES.items():
-                if zone == 'asian_session':
-                    if hour >= times['start'] or hour < times['end']:
-                        active_zones.append(zone)
-                else:
-                    if times['start'] <= hour < times['end']:
-                        active_zones.append(zone)
-            
-            # تعیین کیفیت جلسه
-            if 'new_york_open' in active_zones:
-                session_quality = 'PREMIUM'
-            elif 'london_open' in active_zones:
-                session_quality = 'HIGH'
-            elif 'asian_session' in active_zones:
-                session_quality = 'LOW'
-            else:
-                session_quality = 'MEDIUM'
+            hour = datetime.now(pytz.UTC).hour
+            session_quality = SESSION_QUALITY_BY_HOUR[hour]
             
             return {
-                'active_zones': active_zones,
+                'active_zones': list(KILL_ZONES_BY_HOUR[hour]),
                 'session_quality': session_quality,
-                'optimal_time': session_quality in ['PREMIUM', 'HIGH']
+                'optimal_time': session_quality in ('PREMIUM', 'HIGH')
             }
             
         except Exception as e:
             logger.error(f"Error analyzing kill zones: {e}")
             return {'session_quality': 'MEDIUM', 'optimal_time': False}
     
-    def calculate_optimal_trade_entry(self, data: pd.DataFrame) -> Dict:
+    def calculate_optimal_trade_entry(self, data: Union[pd.DataFrame, OHLCV]) -> Dict:
         """محاسبه Optimal Trade Entry"""
         try:
-            recent_data = data.tail(50)
-            high = recent_data['High'].max()
-            low = recent_data['Low'].min()
-            diff = high - low
+            bars = self.prepare(data)
+            high = np.nanmax(bars.h[-OTE_LOOKBACK:])
+            low = np.nanmin(bars.l[-OTE_LOOKBACK:])
+            levels = high - OTE_RATIOS * (high - low)
             
-            ote_levels = {
-                '61.8%': high - 0.618 * diff,
-                '70.5%': high - 0.705 * diff,
-                '78.6%': high - 0.786 * diff
-            }
+            current_price = bars.c[-1]
+            distances = np.abs(current_price - levels) / current_price
             
-            current_price = data['Close'].iloc[-1]
-            
-            for level_name, level_price in ote_levels.items():
-                distance = abs(current_price - level_price) / current_price
-                if distance < 0.005:
-                    return {
-                        'in_ote_zone': True,
-                        'level': level_name,
-                        'price': level_price,
-                        'distance': distance
-                    }
+            # First level (shallowest retracement) within tolerance wins
+            hits = np.flatnonzero(distances < OTE_TOLERANCE)
+            if hits.size:
+                i = hits[0]
+                return {
+                    'in_ote_zone': True,
+                    'level': OTE_LEVEL_NAMES[i],
+                    'price': levels[i],
+                    'distance': distances[i]
+                }
             
             return {
                 'in_ote_zone': False,
-                'levels': ote_levels
+                'levels': dict(zip(OTE_LEVEL_NAMES, levels))
             }
             
         except Exception as e:
             logger.error(f"Error calculating OTE: {e}")
             return {'in_ote_zone': False}
     
-    def _identify_swing_points(self, data: pd.DataFrame, lookback: int = 5) -> Dict:
+    def _identify_swing_points(self, data: Union[pd.DataFrame, OHLCV], lookback: int = 5) -> Dict:
         """تشخیص Swing Points"""
         try:
-            swing_highs = []
-            swing_lows = []
+            bars = self.prepare(data)
+            index = bars.index
+            if len(index) <= 2 * lookback:
+                return {'highs': [], 'lows': []}
             
-            for i in range(lookback, len(data) - lookback):
-                # Swing High
-                is_swing_high = True
-                for j in range(i - lookback, i + lookback + 1):
-                    if j != i and data['High'].iloc[j] >= data['High'].iloc[i]:
-                        is_swing_high = False
-                        break
-                
-                if is_swing_high:
-                    swing_highs.append({
-                        'index': i,
-                        'price': data['High'].iloc[i],
-                        'timestamp': data.index[i]
-                    })
-                
-                # Swing Low
-                is_swing_low = True
-                for j in range(i - lookback, i + lookback + 1):
-                    if j != i and data['Low'].iloc[j] <= data['Low'].iloc[i]:
-                        is_swing_low = False
-                        break
-                
-                if is_swing_low:
-                    swing_lows.append({
-                        'index': i,
-                        'price': data['Low'].iloc[i],
-                        'timestamp': data.index[i]
-                    })
+            # Market structure and BOS run on the same frame per tick; share one pass
+            key = (id(data), len(index), index[-1], lookback)
+            cached = self._swing_cache.get(key)
+            if cached is not None and cached[0] is data:
+                return cached[1]
+            
+            highs, lows = bars.h, bars.l
+            
+            # Each window row holds bars i-lookback..i+lookback; drop the centre
+            # column so the comparison is strict against every neighbour
+            high_windows = np.delete(sliding_window_view(highs, 2 * lookback + 1), lookback, axis=1)
+            low_windows = np.delete(sliding_window_view(lows, 2 * lookback + 1), lookback, axis=1)
+            
+            centre = slice(lookback, len(index) - lookback)
+            high_idx = np.flatnonzero(highs[centre] > high_windows.max(axis=1)) + lookback
+            low_idx = np.flatnonzero(lows[centre] < low_windows.min(axis=1)) + lookback
+            
+            swing_highs = [
+                {'index': int(i), 'price': highs[i], 'timestamp': index[i]}
+                for i in high_idx[-5:]
+            ]
+            swing_lows = [
+                {'index': int(i), 'price': lows[i], 'timestamp': index[i]}
+                for i in low_idx[-5:]
+            ]
             
-            return {'highs': swing_highs[-5:], 'lows': swing_lows[-5:]}
+            result = {'highs': swing_highs, 'lows': swing_lows}
+            if len(self._swing_cache) >= SWING_CACHE_SIZE:
+                self._swing_cache.pop(next(iter(self._swing_cache)))
+            # Holding the frame keeps its id from being reused by another frame
+            self._swing_cache[key] = (data, result)
+            return result
             
         except Exception as e:
             logger.error(f"Error identifying swing points: {e}")
@@ -3,14 +3,22 @@
 Market Data Provider
 """
 
-import yfinance as yf
-import pandas as pd
+import aiohttp
 import asyncio
+import numpy as np
+import pandas as pd
 import logging
-from typing import Optional
+import time
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+YAHOO_HEADERS = {'User-Agent': 'Mozilla/5.0'}  # the chart endpoint rejects default client agents
+CHART_TIMEOUT = 10  # seconds per chart request
+FETCH_TIMEOUT = 8.0  # seconds get_data waits for a refresh before serving the stale frame
+CHART_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
 class MarketDataProvider:
     """ارائه‌دهنده داده‌های بازار"""
     
@@ -18,7 +26,9 @@ class MarketDataProvider:
         self.symbol = "GC=F"
         self.cache = {}
         self.cache_timeout = 60  # 1 minute cache
-        
+        self._array_cache = {}  # cache_key -> OHLCV float64 arrays + index, filled alongside self.cache
+        self._session: Optional[aiohttp.ClientSession] = None  # keep-alive connection reused across refreshes
+    
     async def initialize(self):
         """راه‌اندازی اولیه"""
         try:
@@ -36,48 +46,101 @@ class MarketDataProvider:
         """دریافت داده‌های بازار"""
         try:
             cache_key = f"{self.symbol}_{period}_{interval}"
+            cached = None
             
             # بررسی cache
             if cache_key in self.cache:
-                cache_data, cache_time = self.cache[cache_key]
-                if (pd.Timestamp.now() - cache_time).total_seconds() < self.cache_timeout:
-                    return cache_data
-            
-            # دریافت داده جدید
-            loop = asyncio.get_event_loop()
-            data = await loop.run_in_executor(
-                None, 
-                self._fetch_data_sync, 
-                period, 
-                interval
-            )
-            
+                cached, cache_time = self.cache[cache_key]
+                if time.monotonic() - cache_time < self.cache_timeout:
+                    return cached
+                    
+            # دریافت داده جدید (only the tail since the last cached bar when a frame exists)
+            try:
+                if cached is not None:
+                    data = await asyncio.wait_for(self._fetch_tail(cached, period, interval), timeout=FETCH_TIMEOUT)
+                else:
+                    data = await asyncio.wait_for(self._fetch_data(period, interval), timeout=FETCH_TIMEOUT)
+            except asyncio.TimeoutError:
+                # A hung endpoint must not stall the signal pipeline; degrade to the last frame
+                logger.warning(f"Market data refresh for {cache_key} timed out after {FETCH_TIMEOUT}s")
+                return cached
+                
             if data is not None and not data.empty:
                 # ذخیره در cache
-                self.cache[cache_key] = (data, pd.Timestamp.now())
+                self.cache[cache_key] = (data, time.monotonic())
+                self._array_cache[cache_key] = self._to_arrays(data)
                 return data
-            
+                
             return None
             
         except Exception as e:
             logger.error(f"Error fetching market data: {e}")
             return None
     
-    def _fetch_data_sync(self, period: str, interval: str) -> Optional[pd.DataFrame]:
-        """دریافت همزمان داده‌ها"""
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Shared HTTP session, created inside the running event loop"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=YAHOO_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=CHART_TIMEOUT)
+            )
+        return self._session
+    
+    async def _fetch_data(self, period: str, interval: str, start: Optional[pd.Timestamp] = None) -> Optional[pd.DataFrame]:
+        """دریافت داده‌ها از Yahoo chart API (full period, or from start onwards)"""
         try:
-            ticker = yf.Ticker(self.symbol)
-            data = ticker.history(period=period, interval=interval)
-            
-            if data.empty:
-                logger.warning(f"No data received for {self.symbol}")
-                return None
-            
-            return data
+            params = {'interval': interval}
+            if start is None:
+                params['range'] = period
+            else:
+                params['period1'] = int(start.timestamp())
+                params['period2'] = int(pd.Timestamp.now(tz='UTC').timestamp())
+                
+            session = await self._get_session()
+            async with session.get(YAHOO_CHART_URL.format(symbol=self.symbol), params=params) as response:
+                if response.status != 200:
+                    logger.warning(f"Chart request for {self.symbol} failed: Status {response.status}")
+                    return None
+                payload = await response.json()
+                
+            result = payload['chart']['result'][0]
+            timestamps = result.get('timestamp')
+            if not timestamps:
+                if start is None:
+                    logger.warning(f"No data received for {self.symbol}")
+                return pd.DataFrame(columns=list(CHART_COLUMNS))
+                
+            # Build the frame straight from the JSON arrays, indexed in exchange time like yfinance
+            quote = result['indicators']['quote'][0]
+            index = pd.to_datetime(timestamps, unit='s', utc=True).tz_convert(
+                result.get('meta', {}).get('exchangeTimezoneName') or 'UTC'
+            )
+            data = pd.DataFrame(
+                {column: quote.get(column.lower()) for column in CHART_COLUMNS},
+                index=index.rename('Datetime'),
+                dtype=float
+            )
+            return data.dropna(how='all')
             
         except Exception as e:
-            logger.error(f"Error in sync data fetch: {e}")
+            logger.error(f"Error in chart data fetch: {e}")
+            return None
+    
+    async def _fetch_tail(self, cached: pd.DataFrame, period: str, interval: str) -> Optional[pd.DataFrame]:
+        """Append bars since the last cached one and trim the frame back to the period"""
+        tail = await self._fetch_data(period, interval, start=cached.index[-1])
+        if tail is None:
             return None
+        if tail.empty:
+            return cached
+            
+        # The last cached bar is refetched too, since it may still have been forming
+        data = pd.concat([cached, tail.tz_convert(cached.index.tz)])
+        data = data[~data.index.duplicated(keep='last')]
+        try:
+            return data.loc[data.index[-1] - pd.Timedelta(period):]
+        except ValueError:
+            return data  # periods like '1mo' have no fixed length; keep the whole frame
     
     async def get_current_price(self) -> Optional[float]:
         """دریافت قیمت فعلی"""
@@ -91,6 +154,30 @@ class MarketDataProvider:
             logger.error(f"Error getting current price: {e}")
             return None
     
+    async def get_arrays(self, period="30d", interval="1h") -> Optional[Dict[str, np.ndarray]]:
+        """OHLCV arrays of get_data, extracted once per cache fill"""
+        data = await self.get_data(period=period, interval=interval)
+        if data is None:
+            return None
+        return self._array_cache.get(f"{self.symbol}_{period}_{interval}")
+    
+    @staticmethod
+    def _to_arrays(data: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Contiguous float64 columns keyed o/h/l/c/v, plus the bar index as ts"""
+        arrays = {
+            key: np.ascontiguousarray(data[column].to_numpy(dtype=np.float64))
+            for key, column in zip('ohlcv', CHART_COLUMNS)
+        }
+        arrays['ts'] = data.index
+        return arrays
+    
     def clear_cache(self):
         """پاک کردن cache"""
         self.cache.clear()
+        self._array_cache.clear()
+    
+    async def close(self):
+        """بستن اتصال HTTP"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
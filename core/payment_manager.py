@@ -3,6 +3,8 @@ Payment Manager for ICT Trading Oracle - ZarinPal Integration
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
 from datetime import datetime, timedelta
@@ -10,8 +12,19 @@ import logging
 # Import settings
 from config.settings import SUBSCRIPTION_PLANS, ZARINPAL_SANDBOX, PAYMENT_CALLBACK_DOMAIN
 
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    _dumps = lambda obj: json.dumps(obj).encode()
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+ZARINPAL_TIMEOUT = 10  # seconds per ZarinPal call
+JSON_HEADERS = {'Content-Type': 'application/json'}  # bodies are pre-encoded, so requests won't set it
+
 class PaymentManager:
     def __init__(self):
         self.merchant_id = os.getenv('ZARINPAL_MERCHANT_ID', 'YOUR_ZARINPAL_MERCHANT')
@@ -22,6 +35,17 @@ class PaymentManager:
             self.base_url = "https://sandbox.zarinpal.com/pg/rest/WebGate/"
         else:
             self.base_url = "https://payment.zarinpal.com/pg/rest/WebGate/"
+        
+        # Keep-alive session so only the first payment call pays the TLS handshake.
+        # urllib3 does not retry POST on status codes, so only connection failures are retried.
+        self._session = requests.Session()
+        retry_strategy = Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry_strategy)
+        self._session.mount(self.base_url, adapter)
     
     def create_payment_request(self, amount, description, user_id, subscription_type):
         """Create payment request"""
@@ -38,14 +62,15 @@ class PaymentManager:
                 "Email": ""
             }
             
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}PaymentRequest.json",
-                json=data,
-                timeout=10
+                data=_dumps(data),
+                headers=JSON_HEADERS,
+                timeout=ZARINPAL_TIMEOUT
             )
             
             if response.status_code == 200:
-                result = response.json()
+                result = _loads(response.content)
                 if result['Status'] == 100:
                     authority = result['Authority']
                     
@@ -86,14 +111,15 @@ class PaymentManager:
                 "Authority": authority
             }
             
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}PaymentVerification.json",
-                json=data,
-                timeout=10
+                data=_dumps(data),
+                headers=JSON_HEADERS,
+                timeout=ZARINPAL_TIMEOUT
             )
             
             if response.status_code == 200:
-                result = response.json()
+                result = _loads(response.content)
                 if result['Status'] == 100:
                     return {
                         'success': True,
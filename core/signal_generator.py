@@ -190,14 +190,15 @@ class SignalGenerator:
             previous_close = data['Close'].iloc[-2]
             change = ((current_price - previous_close) / previous_close) * 100
             
-            # تحلیل‌های ICT
-            market_structure = self.ict_analyzer.analyze_market_structure(data)
-            bos_analysis = self.ict_analyzer.detect_break_of_structure(data)
+            # تحلیل‌های ICT (OHLCV arrays are extracted once and shared by the detectors)
+            bars = self.ict_analyzer.prepare(data)
+            market_structure = self.ict_analyzer.analyze_market_structure(bars)
+            bos_analysis = self.ict_analyzer.detect_break_of_structure(bars)
             liquidity_zones = self.ict_analyzer.identify_liquidity_zones(data)
-            order_blocks = self.ict_analyzer.detect_order_blocks(data)
-            fvgs = self.ict_analyzer.detect_fair_value_gaps(data)
+            order_blocks = self.ict_analyzer.detect_order_blocks(bars)
+            fvgs = self.ict_analyzer.detect_fair_value_gaps(bars)
             kill_zones = self.ict_analyzer.analyze_kill_zones()
-            ote_analysis = self.ict_analyzer.calculate_optimal_trade_entry(data)
+            ote_analysis = self.ict_analyzer.calculate_optimal_trade_entry(bars)
             
             # محاسبه امتیاز ICT
             ict_score = 0
@@ -423,3 +424,4 @@ class SignalGenerator:
                 await self._background_task
             except asyncio.CancelledError:
                 pass
+        await self.market_data_provider.close()
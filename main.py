@@ -10,14 +10,16 @@ import sys
 import logging
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler
+from telegram.request import HTTPXRequest
 from dotenv import load_dotenv
 
 # Attempt to import logging settings first
 try:
-    from config.settings import LOG_LEVEL, LOG_FILE_PATH_CONFIG
+    from config.settings import LOG_LEVEL, LOG_FILE_PATH_CONFIG, BOT_CONNECTION_POOL_SIZE
 except ImportError:
     # Fallback if config.settings is not available or structured differently initially
     LOG_LEVEL = "INFO"
+    BOT_CONNECTION_POOL_SIZE = 50
     # Define a fallback log path if import fails, though main setup below also has one.
     # This helps if logger is used before full setup in rare cases.
     LOG_FILE_PATH_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "ict_trading_fallback.log") 
@@ -69,8 +71,8 @@ def is_admin(user_id: int) -> bool:
 def safe_import_api_manager():
     """Safely import APIManager"""
     try:
-        from core.api_manager import APIManager
-        return APIManager()
+        from core.api_manager import get_api_manager
+        return get_api_manager()
     except ImportError as e:
         logger.error(f"Could not import APIManager: {e}")
         return None
@@ -87,8 +89,8 @@ def safe_import_technical_analyzer():
 def safe_import_database_manager():
     """Safely import DatabaseManager"""
     try:
-        from core.database import DatabaseManager
-        return DatabaseManager()
+        from core.database import get_database_manager
+        return get_database_manager()
     except ImportError as e:
         logger.error(f"Could not import DatabaseManager: {e}")
         return None
@@ -993,7 +995,14 @@ async def main():
         print("CRITICAL ERROR: BOT_TOKEN is None before application build.")
         return
 
-    application = Application.builder().token(BOT_TOKEN).build()
+    # One shared HTTP pool for every Bot API call (handlers and broadcasts alike)
+    request = HTTPXRequest(
+        connection_pool_size=BOT_CONNECTION_POOL_SIZE,
+        pool_timeout=10,
+        connect_timeout=5,
+        read_timeout=20
+    )
+    application = Application.builder().token(BOT_TOKEN).request(request).build()
     
     loop = asyncio.get_running_loop()
     stop_event = asyncio.Event()
@@ -18,9 +18,65 @@ from core.technical_analysis import TechnicalAnalyzer
 from core.database import DatabaseManager
 from ai_models.ml_predictor import MLPredictor
 from ai_models.sentiment_analyzer import SentimentAnalyzer
+from backtest.backtest_analyzer import BacktestAnalyzer
+from core.ict_analyzer import ICTAnalyzer
 
 logger = logging.getLogger(__name__)
 
+# Reference bar-by-bar implementations of the ICT detectors, kept to check the vectorized ones
+def _reference_swing_points(data, lookback=5):
+    """Original nested-loop swing detection"""
+    swing_highs, swing_lows = [], []
+    for i in range(lookback, len(data) - lookback):
+        window = range(i - lookback, i + lookback + 1)
+        if all(data['High'].iloc[j] < data['High'].iloc[i] for j in window if j != i):
+            swing_highs.append({'index': i, 'price': data['High'].iloc[i], 'timestamp': data.index[i]})
+        if all(data['Low'].iloc[j] > data['Low'].iloc[i] for j in window if j != i):
+            swing_lows.append({'index': i, 'price': data['Low'].iloc[i], 'timestamp': data.index[i]})
+    return {'highs': swing_highs[-5:], 'lows': swing_lows[-5:]}
+
+def _reference_order_blocks(data):
+    """Original per-bar order-block scan"""
+    order_blocks = []
+    for i in range(3, len(data) - 1):
+        current, following = data.iloc[i], data.iloc[i + 1]
+        heavy = current['Volume'] > data['Volume'].iloc[i-3:i].mean() * 1.2
+        if current['Close'] < current['Open'] and following['Close'] > current['High'] and heavy:
+            order_blocks.append({'type': 'bullish', 'level': current['Low'], 'high': current['High'],
+                                 'index': i, 'timestamp': data.index[i], 'quality': 'HIGH'})
+        elif current['Close'] > current['Open'] and following['Close'] < current['Low'] and heavy:
+            order_blocks.append({'type': 'bearish', 'level': current['High'], 'low': current['Low'],
+                                 'index': i, 'timestamp': data.index[i], 'quality': 'HIGH'})
+    return order_blocks[-5:]
+
+def _reference_fair_value_gaps(data):
+    """Original three-candle FVG scan"""
+    fvgs = []
+    for i in range(1, len(data) - 1):
+        first, third = data.iloc[i-1], data.iloc[i+1]
+        if first['Low'] > third['High']:
+            fvgs.append({'type': 'bullish', 'upper': first['Low'], 'lower': third['High'],
+                         'size': first['Low'] - third['High'], 'index': i,
+                         'timestamp': data.index[i], 'filled': False})
+        elif first['High'] < third['Low']:
+            fvgs.append({'type': 'bearish', 'upper': third['Low'], 'lower': first['High'],
+                         'size': third['Low'] - first['High'], 'index': i,
+                         'timestamp': data.index[i], 'filled': False})
+    return fvgs[-8:]
+
+def _reference_optimal_trade_entry(data):
+    """Original OTE level loop"""
+    recent_data = data.tail(50)
+    high, low = recent_data['High'].max(), recent_data['Low'].min()
+    ote_levels = {name: high - ratio * (high - low)
+                  for name, ratio in (('61.8%', 0.618), ('70.5%', 0.705), ('78.6%', 0.786))}
+    current_price = data['Close'].iloc[-1]
+    for level_name, level_price in ote_levels.items():
+        distance = abs(current_price - level_price) / current_price
+        if distance < 0.005:
+            return {'in_ote_zone': True, 'level': level_name, 'price': level_price, 'distance': distance}
+    return {'in_ote_zone': False, 'levels': ote_levels}
+
 class ICTTradingTestSuite:
     def __init__(self):
         self.test_results = {}
@@ -47,6 +103,8 @@ class ICTTradingTestSuite:
         await self._test_ml_predictions()
         await self._test_sentiment_analysis()
         await self._test_database_operations()
+        await self._test_backtest_exit_equivalence()
+        await self._test_ict_detector_equivalence()
         
         # Integration tests
         await self._test_bot_integration()
@@ -471,6 +529,143 @@ class ICTTradingTestSuite:
             }
             print(f"   ❌ Error: {e}")
     
+    async def _test_backtest_exit_equivalence(self):
+        """Check vectorized backtest exits against the per-signal reference"""
+        print("🔁 Testing Backtest Exit Equivalence...")
+        
+        test_name = "Backtest Exit Equivalence"
+        
+        try:
+            analyzer = BacktestAnalyzer()
+            rng = np.random.default_rng(42)
+            
+            # Gently trending hourly bars with one wide bar (index 10) that spans both target and stop
+            index = pd.date_range('2024-01-01', periods=72, freq='h')
+            closes = 100 + 0.01 * np.arange(72) + rng.normal(0, 0.3, 72).cumsum()
+            history = pd.DataFrame({'Open': closes, 'High': closes + 1, 'Low': closes - 1,
+                                    'Close': closes, 'Volume': 1000.0}, index=index)
+            history.iloc[10, history.columns.get_loc('High')] = closes[10] + 50
+            history.iloc[10, history.columns.get_loc('Low')] = closes[10] - 50
+            
+            def signal(bar_time, direction, entry, take_profit, stop_loss):
+                return {'timestamp': bar_time, 'signal_direction': direction, 'entry_price': entry,
+                        'take_profit': take_profit, 'stop_loss': stop_loss}
+            
+            entry = closes[5]
+            crafted = [
+                signal(index[5], 'BUY', entry, entry + 20, entry - 20),      # target and stop on bar 10
+                signal(index[5], 'SELL', entry, entry - 20, entry + 20),     # same, short side
+                signal(index[5], 'BUY', entry, entry + 20, entry - 0.5),     # stop on the first bar
+                signal(index[40], 'BUY', closes[40], closes[40] + 100, closes[40] - 100),   # time exit
+                signal(index[40], 'SELL', closes[40], closes[40] - 100, closes[40] + 100),  # time exit
+                signal(index[-1] + pd.Timedelta(hours=5), 'BUY', 100.0, 110.0, 90.0),       # no data
+                signal(index[20] + pd.Timedelta(minutes=30), 'SELL', closes[20], closes[20] - 1, closes[20] + 1),
+            ]
+            
+            # Plus random signals for broader coverage
+            for _ in range(100):
+                bar = int(rng.integers(0, 80))
+                bar_time = index[0] + pd.Timedelta(hours=bar)
+                price = 100 + rng.normal(0, 1)
+                spread = rng.uniform(0.2, 3)
+                direction = 'BUY' if rng.random() < 0.5 else 'SELL'
+                sign = 1 if direction == 'BUY' else -1
+                crafted.append(signal(bar_time, direction, price, price + sign * spread,
+                                      price - sign * spread * rng.uniform(0.5, 2)))
+            
+            signals_df = pd.DataFrame(crafted)
+            expected = pd.DataFrame([analyzer._test_single_signal(row, history)
+                                     for _, row in signals_df.iterrows()])
+            
+            # Exercise both the kernel (_scan_exits) and the NumPy window-matrix fallback
+            mismatches = {}
+            for use_kernel in (True, False):
+                with patch('backtest.backtest_analyzer.NUMBA_AVAILABLE', use_kernel):
+                    actual = analyzer.backtest_signals(signals_df, history)
+                differs = ((actual['exit_reason'].to_numpy() != expected['exit_reason'].to_numpy()) |
+                           (actual['result'].to_numpy() != expected['result'].to_numpy()) |
+                           ~np.isclose(actual['exit_price'], expected['exit_price'].astype(float), atol=0.011) |
+                           ~np.isclose(actual['pnl'], expected['pnl'].astype(float), atol=0.011))
+                mismatches['kernel' if use_kernel else 'numpy'] = int(differs.sum())
+            
+            reasons = set(expected['exit_reason'])
+            covered = {'TARGET_HIT', 'STOP_HIT', 'TIME_EXIT', 'NO_DATA'} <= reasons
+            same_bar_targets = list(expected['exit_reason'][:2]) == ['TARGET_HIT', 'TARGET_HIT']
+            
+            self.test_results[test_name] = {
+                'status': 'PASS' if covered and same_bar_targets and not any(mismatches.values()) else 'FAIL',
+                'signals': len(signals_df),
+                'mismatches': mismatches,
+                'exit_reasons': sorted(reasons)
+            }
+            
+            print(f"   ✅ {len(signals_df)} signals, mismatches: {mismatches}")
+            
+        except Exception as e:
+            self.test_results[test_name] = {
+                'status': 'ERROR',
+                'error': str(e)
+            }
+            print(f"   ❌ Error: {e}")
+    
+    async def _test_ict_detector_equivalence(self):
+        """Check the vectorized ICT detectors against the bar-by-bar references"""
+        print("🧭 Testing ICT Detector Equivalence...")
+        
+        test_name = "ICT Detector Equivalence"
+        
+        try:
+            rng = np.random.default_rng(7)
+            checks = {
+                '_identify_swing_points': _reference_swing_points,
+                'detect_order_blocks': _reference_order_blocks,
+                'detect_fair_value_gaps': _reference_fair_value_gaps,
+                'calculate_optimal_trade_entry': _reference_optimal_trade_entry,
+            }
+            mismatches = {name: 0 for name in checks}
+            frames = 0
+            
+            for length in (12, 60, 300):
+                for attempt in range(20):
+                    # Prices rounded to 0.1 so equal highs/lows (plateaus) actually occur
+                    closes = 100 + rng.normal(0, 1, length).cumsum()
+                    opens = closes + rng.normal(0, 1, length)
+                    data = pd.DataFrame({
+                        'Open': opens,
+                        'High': np.round(np.maximum(opens, closes) + rng.random(length), 1),
+                        'Low': np.round(np.minimum(opens, closes) - rng.random(length), 1),
+                        'Close': closes,
+                        'Volume': rng.integers(100, 1000, length).astype(float)
+                    }, index=pd.date_range('2024-01-01', periods=length, freq='h'))
+                    if attempt % 2:
+                        # Chart frames keep rows with a null volume, so every other frame carries ~10% NaN
+                        data.loc[rng.random(length) < 0.1, 'Volume'] = np.nan
+                    
+                    # A fresh analyzer per frame keeps the swing cache out of the comparison
+                    analyzer = ICTAnalyzer()
+                    bars = analyzer.prepare(data)
+                    for name, reference in checks.items():
+                        expected = reference(data)
+                        method = getattr(analyzer, name)
+                        if method(data) != expected or method(bars) != expected:
+                            mismatches[name] += 1
+                    frames += 1
+            
+            self.test_results[test_name] = {
+                'status': 'PASS' if not any(mismatches.values()) else 'FAIL',
+                'frames': frames,
+                'mismatches': mismatches
+            }
+            
+            print(f"   ✅ {frames} frames, mismatches: {mismatches}")
+            
+        except Exception as e:
+            self.test_results[test_name] = {
+                'status': 'ERROR',
+                'error': str(e)
+            }
+            print(f"   ❌ Error: {e}")
+    
     def _cleanup_test_data(self):
         """Clean up test data from database"""
         try: